@@ -0,0 +1,171 @@
+from helpers import *
+from constants import *
+from tower import Tower
+
+# project.json keys, in file order
+PARAMETER_KEYS = ('k_factor', 'avg_u_speed', 'avg_u_height', 'z0', 'down_time',
+                  'turbine_diameter', 'hub_height', 'cp', 'dt_efficiency')
+
+
+def broadcast_parameters(params):
+    '''
+    convert project.json-style parameters (scalars, strings or arrays) to float arrays
+    broadcast against each other and flattened to one value per design \n
+    input: dict with the PARAMETER_KEYS
+    '''
+    missing = [key for key in PARAMETER_KEYS if key not in params]
+    if missing:
+        raise KeyError(f'missing design parameters: {", ".join(missing)}')
+
+    arrays = np.broadcast_arrays(*[np.asarray(params[key], dtype=np.float64) for key in PARAMETER_KEYS])
+
+    return {key: np.ravel(array) for key, array in zip(PARAMETER_KEYS, arrays)}
+
+
+def hub_wind(p):
+    '''
+    average wind speed at hub height (log law) and weibull 'c' parameter \n
+    input: dict returned by broadcast_parameters
+    '''
+    z0 = p['z0'] / 1000 # meters
+    hub_speed = log_law(p['avg_u_speed'], p['avg_u_height'], p['hub_height'], z0)
+    c_weibull = weibull_c(hub_speed, p['k_factor'])
+
+    return hub_speed, c_weibull
+
+
+def design_speeds(params, rho=RHO, cutin_limit=CUTIN_LIMIT, rated_limit=RATED_LIMIT, cutout_limit=CUTOUT_LIMIT):
+    '''
+    compute only the design speeds and rated power of many designs, solving the weibull energy CDF
+    for the exact rated and cut-out speeds, without building any speed grid \n
+    input: dict of project.json parameters, each a scalar or an array \n
+    output: dict of arrays with shape (designs,)
+    '''
+    p = broadcast_parameters(params)
+    hub_speed, c_weibull = hub_wind(p)
+
+    speed_rated = weibull_energy_speed(rated_limit, p['k_factor'], c_weibull)
+    speed_cutout = weibull_energy_speed(cutout_limit, p['k_factor'], c_weibull)
+
+    # cut-in speed from rated power reduces to a fraction of the rated speed
+    area = np.pi * (p['turbine_diameter'] / 2) ** 2
+    rated_power = rotor_power(rho, area, speed_rated, p['cp'], p['dt_efficiency'])
+    speed_cutin = cutin_limit ** (1/3) * speed_rated
+
+    return {
+        'hub_speed': hub_speed,
+        'c_weibull': c_weibull,
+        'speed_rated': speed_rated,
+        'speed_cutout': speed_cutout,
+        'speed_cutin': speed_cutin,
+        'area': area,
+        'rated_power': rated_power,
+    }
+
+
+def design_batch(params, step=WIND_STEP, hours=YEAR_HOURS, rho=RHO,
+                 cutin_limit=CUTIN_LIMIT, rated_limit=RATED_LIMIT, cutout_limit=CUTOUT_LIMIT,
+                 speed_method=SPEED_METHOD, vectors=True, tower_sections=0):
+    '''
+    evaluate the whole Wind -> Turbine -> Mechanics chain of main.py for many designs at once \n
+    input: dict of project.json parameters, each a scalar or an array (same units as project.json) \n
+    output: dict of arrays, scalars per design with shape (designs,) and,
+    if 'vectors' is set, distributions per design and speed bin with shape (designs, bins) \n
+    'speed_method' selects rated and cut-out speeds from the speed bins ('binned') or the weibull energy CDF ('analytic') \n
+    'tower_sections' > 0 gives the steel mass of a tapered tower with that many sections instead of a cylinder
+    '''
+    p = broadcast_parameters(params)
+
+    # unit conversions as done in main.py
+    k = p['k_factor'][:, None]
+    down_time = p['down_time'][:, None] / 100
+    hub_height = p['hub_height']
+    cp = p['cp']
+    efficiency = p['dt_efficiency']
+
+    # wind speed array shared by every design
+    speed_vector = np.arange(0, 30, step)
+    u = speed_vector[None, :]
+
+    ''' 1) Wind Resources '''
+    # average wind speed at hub height, weibull 'c' parameter and speed probability distribution function
+    hub_speed, c_weibull = hub_wind(p)
+    speed_probability = weibull_pdf(u, k, c_weibull[:, None])
+
+    # annual distribution of hours and energy density for each wind speed
+    hour_distribution = speed_probability * (hours * step)
+    energy_distribution = 0.5 * rho * (u ** 3) * hour_distribution
+
+    # energy cumulative distribution function along the speed axis
+    energy_cdf = cdf(energy_distribution, axis=1)
+
+    # rated and cutout speed, same as Wind.rated_speed and Wind.cutout_speed
+    if speed_method == 'analytic':
+        speed_rated = weibull_energy_speed(rated_limit, p['k_factor'], c_weibull)
+        speed_cutout = weibull_energy_speed(cutout_limit, p['k_factor'], c_weibull)
+    else:
+        speed_rated = binned_energy_speed(speed_vector, energy_cdf, rated_limit, axis=1)
+        speed_cutout = binned_energy_speed(speed_vector, energy_cdf, cutout_limit, axis=1)
+
+    ''' 2) Wind Energy Converter '''
+    area = np.pi * (p['turbine_diameter'] / 2) ** 2
+    rated_power = rotor_power(rho, area, speed_rated, cp, efficiency)
+    speed_cutin = rotor_speed(cutin_limit * rated_power, rho, area, cp, efficiency)
+
+    # power curve with cut-in, rated power and cut-out
+    power_curve = cubic_power_curve(u, rho, area[:, None], cp[:, None], efficiency[:, None],
+                                    rated_power[:, None], speed_cutin[:, None], speed_cutout[:, None])
+
+    ''' 3) Energy production '''
+    energy_vector = power_curve * (hour_distribution * (1 - down_time))
+    energy_production = energy_vector.sum(axis=1)
+    full_load_hours = (energy_vector / rated_power[:, None]).sum(axis=1)
+    average_power = energy_production / hour_distribution.sum(axis=1)
+
+    # exact integration of the power curve over the weibull distribution
+    energy_production_analytic = hours * (1 - down_time[:, 0]) * analytic_energy(
+        rho, area, cp, efficiency, rated_power, speed_cutin, speed_rated, speed_cutout, p['k_factor'], c_weibull)
+    energy_discrepancy = (energy_production - energy_production_analytic) / energy_production_analytic
+
+    ''' 4) Mechanics '''
+    tower = Tower(hub_height)
+    tower.gravity_load(rated_power)
+    tower.aerodynamic_load(rho, area, speed_rated)
+    tower.extreme_wind_load(rho, area)
+    tower.steel_mass()
+    if tower_sections:
+        tower.tapered_sections(tower_sections)
+        tower_mass = tower.tapered_mass
+    else:
+        tower_mass = tower.mass
+
+    result = {
+        'hub_speed': hub_speed,
+        'c_weibull': c_weibull,
+        'speed_rated': speed_rated,
+        'speed_cutout': speed_cutout,
+        'speed_cutin': speed_cutin,
+        'area': area,
+        'rated_power': rated_power,
+        'energy_production': energy_production,
+        'energy_production_analytic': energy_production_analytic,
+        'energy_discrepancy': energy_discrepancy,
+        'full_load_hours': full_load_hours,
+        'average_power': average_power,
+        'thickness_gravity': tower.thickness_gravity,
+        'thickness_aerodynamic': tower.thickness_aerodynamic,
+        'thickness_extreme_wind': tower.thickness_extreme_wind,
+        'tower_mass': tower_mass,
+    }
+
+    if vectors:
+        result.update({
+            'speed_vector': speed_vector,
+            'hour_distribution': hour_distribution,
+            'energy_distribution': energy_distribution,
+            'energy_cdf': energy_cdf,
+            'power_curve': power_curve,
+            'energy_vector': energy_vector,
+        })
+
+    return result
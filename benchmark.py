@@ -0,0 +1,201 @@
+from main import load_params, design_turbine, project_file
+from constants import *
+
+import os
+import re
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+
+report_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'report.txt')
+
+STEPS = (1, 0.1, 0.01, 0.001) # speed_vector resolution, m/s
+BATCH_SIZES = (1, 100, 10_000, 100_000) # designs per design_batch call
+
+# report.txt lines checked against a fresh design at the default resolution
+REPORT_FIELDS = {
+    'Average speed at hub height': ('hub_speed', 1),
+    'Turbine rated power': ('rated_power', 1/1000),
+    'One year energy production': ('energy_production', 1/1000000),
+    'Full-load hours': ('full_load_hours', 1),
+    'Turbine average power': ('average_power', 1/1000),
+    'Binned vs analytic energy production discrepancy': ('energy_discrepancy', 100),
+    'Tower thickness due to gravity load': ('thickness_gravity', 1000),
+    'Tower thickness due to aerodinamic load': ('thickness_aerodynamic', 1000),
+    'Tower thickness due to extreme wind load': ('thickness_extreme_wind', 1000),
+}
+
+
+def measure(function, repeat=5):
+    '''
+    time 'function' over 'repeat' calls and measure its peak allocated memory in one extra call \n
+    returns dict with median and best time in seconds and peak bytes
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    # memory tracing slows calls down, so it is kept out of the timed runs
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times.sort()
+    return {'time_median': times[len(times) // 2], 'time_min': times[0], 'peak_bytes': peak}
+
+
+def pipeline_scenarios(params, steps=STEPS, repeat=5):
+    '''
+    time each Wind/Turbine stage of a single design as the speed grid gets finer
+    '''
+    from turbine import Wind, Turbine
+    from helpers import cdf
+
+    records = []
+    for step in steps:
+        # one full design to have the inputs of every stage ready
+        wind = Wind(params['avg_u_speed'], params['avg_u_height'], RHO, step)
+        wind.wind_profile(params['hub_height'], params['z0']/1000)
+        wind.weibull(params['k_factor'])
+        wind.hourly_distribution(YEAR_HOURS)
+        wind.energy_density_distribution()
+        wind.rated_speed(RATED_LIMIT)
+        wind.cutout_speed(CUTOUT_LIMIT)
+
+        turbine = Turbine(wind.speed_vector, params['turbine_diameter'], params['hub_height'], params['cp'],
+                          params['dt_efficiency'], params['down_time']/100, RHO)
+        turbine.calculate_rated_power(wind.speed_rated)
+        turbine.cutin_speed(CUTIN_LIMIT)
+        turbine.hourly_distribution_downtime(wind.hour_distribution_vector)
+
+        stages = {
+            'Wind.weibull': lambda: wind.weibull(params['k_factor']),
+            'Wind.energy_density_distribution': wind.energy_density_distribution,
+            'helpers.cdf': lambda: cdf(wind.energy_distribution_vector),
+            'Turbine.power_curve': lambda: turbine.power_curve(wind.speed_cutout, wind.speed_rated),
+            'Turbine.energy': turbine.energy,
+        }
+        for stage, function in stages.items():
+            record = {'scenario': 'pipeline', 'stage': stage, 'step': step, 'bins': len(wind.speed_vector)}
+            record.update(measure(function, repeat))
+            records.append(record)
+
+    return records
+
+
+def batch_scenarios(params, sizes=BATCH_SIZES, repeat=3):
+    '''
+    time design_batch as the number of designs grows, diameters spread around the project value
+    '''
+    import numpy as np
+    from batch import design_batch
+
+    records = []
+    for size in sizes:
+        batch = dict(params, turbine_diameter=np.linspace(0.5, 1.5, size) * params['turbine_diameter'])
+        record = {'scenario': 'batch', 'stage': 'design_batch', 'step': WIND_STEP, 'designs': size}
+        record.update(measure(lambda: design_batch(batch), repeat))
+        records.append(record)
+
+    return records
+
+
+def accuracy_check(params, path=report_file):
+    '''
+    compare a fresh design with the numbers of report.txt, at the precision they are printed with;
+    only the REPORT_FIELDS lines present in the file are checked, so a report written before a line
+    was added (e.g. the energy discrepancy) is compared on the lines both versions share
+    '''
+    result = design_turbine(params).as_dict()
+
+    with open(path, 'r') as file:
+        text = file.read()
+
+    checks = {}
+    for label, (name, scale) in REPORT_FIELDS.items():
+        match = re.search(re.escape(label) + r': ([-\d.]+)', text)
+        if match is None:
+            continue
+        expected = float(match.group(1))
+        value = round(result[name] * scale, 2)
+        checks[name] = {'expected': expected, 'value': value, 'ok': abs(value - expected) < 0.005}
+
+    return checks
+
+
+def git_revision():
+    '''
+    current commit of the repository, if available
+    '''
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.realpath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(records, baseline, tolerance=1.2):
+    '''
+    ratio of median times against a baseline benchmark, flagging slowdowns above 'tolerance'
+    '''
+    def key(record):
+        return (record['scenario'], record['stage'], record['step'], record.get('designs'))
+
+    previous = {key(record): record for record in baseline['records']}
+    rows = []
+    for record in records:
+        if key(record) in previous:
+            ratio = record['time_median'] / previous[key(record)]['time_median']
+            rows.append((key(record), ratio, ratio > tolerance))
+
+    return rows
+
+
+def run(steps=STEPS, sizes=BATCH_SIZES, repeat=5, project=project_file):
+    '''
+    run every scenario and return the benchmark as a json serializable dict
+    '''
+    params = load_params(project)
+
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'accuracy': accuracy_check(params),
+        'records': pipeline_scenarios(params, steps, repeat) + batch_scenarios(params, sizes, max(1, repeat // 2)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark of the wind turbine design pipeline')
+    parser.add_argument('--steps', type=float, nargs='+', default=STEPS)
+    parser.add_argument('--sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help='baseline benchmark json to compare with')
+    args = parser.parse_args()
+
+    benchmark = run(args.steps, args.sizes, args.repeat)
+    with open(args.output, 'w') as file:
+        json.dump(benchmark, file, indent=4)
+
+    for record in benchmark['records']:
+        size = f'{record["designs"]} designs' if 'designs' in record else f'{record["bins"]} bins'
+        print(f'{record["stage"]:<34} step {record["step"]:<6g} {size:<16} '
+              f'{record["time_median"]*1000:10.3f} ms {record["peak_bytes"]/2**20:10.2f} MiB')
+
+    failed = [name for name, check in benchmark['accuracy'].items() if not check['ok']]
+    print(f'\naccuracy against report.txt: {"ok" if not failed else "differs in " + ", ".join(failed)}')
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        for (scenario, stage, step, designs), ratio, slower in compare(benchmark['records'], baseline):
+            flag = '  <-- slower' if slower else ''
+            print(f'{stage:<34} step {step:<6g} {designs or "":<8} x{ratio:.2f}{flag}')
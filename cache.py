@@ -0,0 +1,179 @@
+from turbine import *
+from constants import *
+
+import os
+import json
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+cache_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '.wind_cache')
+
+# Wind vectors stored for each site, one row each in the cached array
+WIND_VECTORS = ('speed_probability_vector', 'hour_distribution_vector',
+                'energy_distribution_vector', 'energy_cdf_vector')
+# Wind scalars stored next to the array
+WIND_VALUES = ('average', 'height', 'rho', 'step', 'hub_speed', 'k', 'c_weibull')
+
+
+def site_key(k_factor, avg_u_speed, avg_u_height, z0, hub_height, step, rho=RHO, hours=YEAR_HOURS):
+    '''
+    content hash of the parameters that define a wind resource
+    '''
+    values = [float(v) for v in (k_factor, avg_u_speed, avg_u_height, z0, hub_height, step, rho, hours)]
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()[:32]
+
+
+class WindCache():
+    '''
+    class to store computed Wind distributions on disk as memory-mappable arrays,
+    evicting the least recently used sites above a size limit
+    '''
+
+    def __init__(self, directory=cache_dir, max_bytes=256 * 2**20, memory_size=128):
+        '''
+        initialize cache in 'directory' holding up to 'max_bytes' on disk
+        and 'memory_size' sites already mapped in this process
+        '''
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+
+    def paths(self, key):
+        '''
+        array and metadata file of a site
+        '''
+        base = os.path.join(self.directory, key)
+        return base + '.npy', base + '.json'
+
+
+    def load(self, key):
+        '''
+        memory-map the arrays of a site, returns None if the site is not cached
+        '''
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        array_path, meta_path = self.paths(key)
+        try:
+            with open(meta_path, 'r') as file:
+                values = json.load(file)
+            array = np.load(array_path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # touch the file so eviction sees it as recently used
+        try:
+            os.utime(array_path)
+        except FileNotFoundError:
+            pass
+        self.remember(key, (values, array))
+
+        return values, array
+
+
+    def remember(self, key, entry):
+        '''
+        keep a mapped site in memory, dropping the oldest above memory_size
+        '''
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+
+    def store(self, key, wind):
+        '''
+        write the vectors and values of a Wind object to disk
+        '''
+        array_path, meta_path = self.paths(key)
+        values = {name: float(getattr(wind, name)) for name in WIND_VALUES}
+
+        # write to temporary files of this writer first so readers and other writers never see partial files
+        array_temp = self.temporary(key)
+        with open(array_temp, 'wb') as file:
+            np.save(file, np.vstack([getattr(wind, name) for name in WIND_VECTORS]).astype(np.float64))
+        meta_temp = self.temporary(key)
+        with open(meta_temp, 'w') as file:
+            json.dump(values, file)
+        os.replace(meta_temp, meta_path)
+        os.replace(array_temp, array_path)
+
+        self.evict()
+
+
+    def temporary(self, key):
+        '''
+        path of a new temporary file in the cache directory, unique to the caller
+        '''
+        handle, path = tempfile.mkstemp(prefix=key + '.', suffix='.tmp', dir=self.directory)
+        os.close(handle)
+        return path
+
+
+    def evict(self):
+        '''
+        remove least recently used sites until the cache fits in max_bytes
+        '''
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                # another process may have evicted it meanwhile
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name[:-4]))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in self.paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.memory.pop(key, None)
+            total -= size
+
+
+    def wind(self, average, height, h, z0, k, rho=RHO, step=WIND_STEP, hours=YEAR_HOURS):
+        '''
+        return a Wind object with weibull, hour and energy distributions at hub height 'h',
+        computed once per site and then mapped from disk without copying \n
+        input: same parameters as Wind, Wind.wind_profile, Wind.weibull and Wind.hourly_distribution
+        '''
+        key = site_key(k, average, height, z0, h, step, rho, hours)
+        entry = self.load(key)
+
+        if entry is None:
+            self.misses += 1
+
+            wind = Wind(average, height, rho, step)
+            wind.wind_profile(h, z0)
+            wind.weibull(k)
+            wind.hourly_distribution(hours)
+            wind.energy_density_distribution()
+
+            self.store(key, wind)
+            return wind
+
+        self.hits += 1
+        values, array = entry
+
+        wind = Wind(values['average'], values['height'], values['rho'], step)
+        wind.hub_speed = values['hub_speed']
+        wind.k = values['k']
+        wind.c_weibull = values['c_weibull']
+        for name, vector in zip(WIND_VECTORS, array):
+            setattr(wind, name, vector)
+
+        return wind
@@ -0,0 +1,23 @@
+# project considerations
+WIND_STEP = 1
+CUTIN_LIMIT = 1/100
+RATED_LIMIT = 1/3
+CUTOUT_LIMIT = 8/10
+SPEED_METHOD = 'binned' # 'binned' looks up speed_vector, 'analytic' solves the weibull energy cdf
+AEP_METHOD = 'binned' # 'binned' sums over speed_vector, 'analytic' integrates the weibull pdf
+PLOT_MODE = 'show' # 'show' opens windows, 'headless' renders files in parallel without GUI, 'off' skips plots
+
+# project boundary conditions
+SIGMA_ALLOWED = 160*(10**6) # Pascal (160 MPa)
+TOWER_SLENDERNESS = 20 # hub height / tower diameter
+NACELLE_WEIGHT_POWER = 40 # kg/kW
+SOLIDITY = 0.03
+CD = 1.5 # drag coefficient
+CT = 8/9 # thrust coefficient
+EXTREME_WIND_SPEED = 60 # m/s, IEC class II
+
+# general parameters
+YEAR_HOURS = 365.25 * 24 # hours
+RHO = 1.225 # kg/m3
+GRAVITY = 9.81 # m/s2
+STEEL_DENSITY = 7850 # kg/m3
@@ -0,0 +1,146 @@
+from timeseries import *
+
+import warnings
+
+STANDARD_PRESSURE = 101325 # Pa, sea level
+STANDARD_TEMPERATURE = 288.15 # K, sea level
+LAPSE_RATE = 0.0065 # K/m, standard atmosphere
+GAS_CONSTANT = 287.05 # J/(kg K), dry air
+DENSITY_RANGE = (0.5, 1.7) # kg/m3, limits of the joint histogram density bins, about 8500 m to -60 °C at sea level
+DENSITY_STEP = 0.01 # kg/m3
+
+
+def barometric_pressure(elevation):
+    '''
+    pressure of the standard atmosphere in Pa at an elevation in meters above sea level
+    '''
+    return STANDARD_PRESSURE * (1 - LAPSE_RATE * elevation / STANDARD_TEMPERATURE) ** (GRAVITY / (GAS_CONSTANT * LAPSE_RATE))
+
+
+def air_density(temperature, pressure=None, elevation=0):
+    '''
+    dry air density in kg/m3 from the ideal gas law \n
+    input: temperature in °C and pressure in Pa, or elevation in meters above sea level
+    when the pressure is not measured (barometric formula)
+    '''
+    if pressure is None:
+        pressure = barometric_pressure(elevation)
+
+    return pressure / (GAS_CONSTANT * (temperature + 273.15))
+
+
+def normalized_speed(speed, rho, rho_reference=RHO):
+    '''
+    wind speed normalized to the reference density of the power curve (IEC 61400-12-1),
+    a turbine at density 'rho' produces the reference power of the normalized speed
+    '''
+    return speed * (rho / rho_reference) ** (1/3)
+
+
+class SpeedDensityHistogram(SpeedHistogram):
+    '''
+    class to accumulate measured wind speeds and air densities into a joint (speed x density) histogram
+    '''
+
+    def __init__(self, speed_vector, step, density_range=DENSITY_RANGE, density_step=DENSITY_STEP):
+        '''
+        initialize empty histogram over 'speed_vector' bins of width 'step' and uniform density bins
+        '''
+        super().__init__(speed_vector, step)
+
+        self.density_start = density_range[0]
+        self.density_step = density_step
+        n_densities = int(round((density_range[1] - density_range[0]) / density_step))
+        self.density_vector = self.density_start + (np.arange(n_densities) + 0.5) * density_step
+
+        self.counts_matrix = np.zeros((len(speed_vector), n_densities), dtype=np.int64)
+        self.density_sum = 0.0
+        self.density_sum_vector = np.zeros(len(speed_vector)) # exact densities summed per speed bin
+        self.out_of_density_range = 0
+
+
+    def add(self, speeds, densities):
+        '''
+        add a block of wind speeds and air densities, samples missing either value (nan) are ignored \n
+        densities outside the density range are counted in the first or last density bin, with a warning
+        '''
+        valid = np.isfinite(speeds) & np.isfinite(densities)
+        speeds, densities = speeds[valid], densities[valid]
+        super().add(speeds)
+
+        # nearest speed bin and density bin of each sample
+        index = np.floor(speeds / self.step + 0.5).astype(np.int64)
+        inside = (index >= 0) & (index < self.counts_matrix.shape[0])
+        column = np.floor((densities - self.density_start) / self.density_step).astype(np.int64)
+
+        outside = np.count_nonzero((column < 0) | (column >= self.counts_matrix.shape[1]))
+        if outside:
+            self.out_of_density_range += outside
+            warnings.warn(f'{outside} air densities outside {self.density_start:g} - '
+                          f'{self.density_vector[-1] + self.density_step / 2:g} kg/m3 counted in the edge bins')
+        column = np.clip(column, 0, self.counts_matrix.shape[1] - 1)
+
+        flat = index[inside] * self.counts_matrix.shape[1] + column[inside]
+        self.counts_matrix += np.bincount(flat, minlength=self.counts_matrix.size).reshape(self.counts_matrix.shape)
+        self.density_sum_vector += np.bincount(index[inside], weights=densities[inside], minlength=self.counts_matrix.shape[0])
+        self.density_sum += densities.sum()
+
+
+    def average_density(self):
+        '''
+        average of all densities added
+        '''
+        return self.density_sum / self.samples
+
+
+    def density_per_speed(self):
+        '''
+        mean air density of each speed bin, from the measured values, the average density for empty bins
+        '''
+        empty = np.full(len(self.counts_vector), self.average_density())
+        return np.divide(self.density_sum_vector, self.counts_vector, out=empty, where=self.counts_vector > 0)
+
+
+    def hour_distribution(self, hours=YEAR_HOURS):
+        '''
+        create hours at each speed and density bin (speed bins x density bins)
+        '''
+        self.hour_distribution_matrix = self.counts_matrix * (hours / self.samples)
+        return self.hour_distribution_matrix
+
+
+    def energy(self, power_curve, hours=YEAR_HOURS, down_time=0, rho_reference=RHO):
+        '''
+        energy production in Wh of a PowerCurve measured at 'rho_reference', evaluated once per
+        speed and density bin at the density-normalized speed
+        '''
+        hours_matrix = self.hour_distribution(hours) * (1 - down_time)
+        speed = normalized_speed(self.speed_vector[:, None], self.density_vector[None, :], rho_reference)
+
+        self.energy_matrix = power_curve(speed) * hours_matrix
+        return self.energy_matrix.sum()
+
+
+def measured_wind_density(path, columns, measured_height, hub_height, z0, elevation=0, step=WIND_STEP,
+                          hours=YEAR_HOURS, chunk_size=CHUNK_SIZE, density_step=DENSITY_STEP):
+    '''
+    create a Wind object from measured wind speeds and air temperatures (and pressures) streamed from disk,
+    with the air density of each sample binned with its hub height speed \n
+    input: file path and columns (speed, temperature in °C[, pressure in Pa]), measurement and hub heights,
+    surface roughness and site elevation in meters; the pressure at hub height follows the barometric
+    formula when it is not measured \n
+    wind.rho is the average density and wind.rho_vector the mean density of each speed bin,
+    for Wind.wind_power_distribution; the joint histogram is stored as wind.histogram
+    '''
+    wind = Wind(None, measured_height, RHO, step)
+    histogram = SpeedDensityHistogram(wind.speed_vector, step, density_step=density_step)
+
+    for chunk in read_chunks(path, columns, chunk_size):
+        pressure = chunk[:, 2] if chunk.shape[1] > 2 else None
+        histogram.add(log_law(chunk[:, 0], measured_height, hub_height, z0),
+                      air_density(chunk[:, 1], pressure, elevation + hub_height))
+
+    wind.rho = histogram.average_density()
+    wind.rho_vector = histogram.density_per_speed()
+
+    return histogram_wind(wind, histogram, hub_height, z0, hours)
@@ -0,0 +1,169 @@
+from turbine import *
+from constants import *
+
+from scipy.spatial import cKDTree
+
+WAKE_DECAY = 0.075 # Jensen wake decay constant, onshore
+WAKE_TOLERANCE = 1e-3 # velocity deficit below which turbine pairs are ignored
+
+
+class Farm():
+    '''
+    class to represent a wind farm of many turbines with Jensen (Park) wake losses
+    '''
+
+    def __init__(self, x, y, turbines, wake_decay=WAKE_DECAY, wake_tolerance=WAKE_TOLERANCE):
+        '''
+        initialize farm with turbine positions in meters (x east, y north) and Turbine objects \n
+        input: 'turbines' is one Turbine used at every position or one per position; their power
+        curves must be computed on the same speed vector
+        '''
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        n = self.x.size
+
+        if isinstance(turbines, Turbine):
+            turbines = [turbines] * n
+        if len(turbines) != n:
+            raise ValueError(f'{len(turbines)} turbines given for {n} positions')
+
+        self.turbines = turbines
+        self.wake_decay = wake_decay
+        self.wake_tolerance = wake_tolerance
+
+        # turbine parameters as arrays, one row per turbine
+        self.speed_vector = turbines[0].speed_vector
+        self.step = self.speed_vector[1] - self.speed_vector[0]
+        self.diameter = np.array([t.diameter for t in turbines], dtype=np.float64)
+        self.down_time = np.array([t.down_time for t in turbines], dtype=np.float64)
+        self.power_curve_matrix = np.vstack([t.power_curve_vector for t in turbines])
+
+
+    def wind_rose(self, directions, frequencies, k, c, hours=YEAR_HOURS):
+        '''
+        create hour distribution of each direction sector (sectors x speed bins) \n
+        input: direction the wind comes from (degrees from north), sector frequencies,
+        weibull k and c of each sector at hub height and number of hours in the period of interest;
+        frequencies, k and c may be scalars shared by every sector (same as Wind.wind_rose)
+        '''
+        # sectors of a Wind on the speed vector of the turbines
+        wind = Wind(None, None, None, self.step)
+        wind.speed_vector = self.speed_vector
+        wind.wind_rose(directions, frequencies, k, c)
+        wind.hourly_distribution(hours)
+
+        self.directions = wind.sector_directions
+        self.frequencies = wind.sector_frequencies
+        self.sector_hours_matrix = wind.hour_distribution_matrix
+
+
+    def wind_resource(self, wind, hours=YEAR_HOURS):
+        '''
+        use the sectors of a Wind object created with Wind.wind_rose
+        '''
+        self.wind_rose(wind.sector_directions, wind.sector_frequencies, wind.sector_k, wind.sector_c, hours)
+
+
+    def thrust_coefficient(self):
+        '''
+        thrust coefficient of each turbine at each speed (Turbine.thrust_coefficient)
+        '''
+        # a turbine used at many positions is computed once
+        for turbine in {id(turbine): turbine for turbine in self.turbines}.values():
+            turbine.thrust_coefficient()
+
+        self.ct_matrix = np.vstack([turbine.ct_vector for turbine in self.turbines])
+
+
+    def interacting_pairs(self):
+        '''
+        find turbine pairs close enough for a wake deficit above the tolerance, for any direction \n
+        stores upstream and downstream indexes of each candidate pair
+        '''
+        # distance where the largest possible deficit falls below the tolerance
+        largest_deficit = 1 - np.sqrt(1 - CT)
+        diameter = self.diameter.max()
+        reach = diameter / (2 * self.wake_decay) * (np.sqrt(largest_deficit / self.wake_tolerance) - 1)
+
+        tree = cKDTree(np.column_stack((self.x, self.y)))
+        pairs = tree.query_pairs(reach, output_type='ndarray')
+
+        # both orders, the direction decides which one is upstream
+        self.upstream = np.concatenate((pairs[:, 0], pairs[:, 1]))
+        self.downstream = np.concatenate((pairs[:, 1], pairs[:, 0]))
+
+
+    def wake_deficit(self):
+        '''
+        compute velocity deficit of every turbine for every sector and speed bin
+        (turbines x sectors x bins), combining overlapping wakes by sum of squares
+        '''
+        self.thrust_coefficient()
+        self.interacting_pairs()
+
+        up, down = self.upstream, self.downstream
+        radians = np.deg2rad(self.directions)
+
+        # downwind and crosswind distance of each pair for each sector (pairs x sectors)
+        dx = (self.x[down] - self.x[up])[:, None]
+        dy = (self.y[down] - self.y[up])[:, None]
+        downwind = -(dx * np.sin(radians) + dy * np.cos(radians))
+        crosswind = np.abs(dx * np.cos(radians) - dy * np.sin(radians))
+
+        # keep only pairs where the rotor center of the downstream turbine is inside the wake cone
+        diameter = self.diameter[up][:, None]
+        inside = (downwind > 0) & (crosswind < diameter / 2 + self.wake_decay * downwind)
+        pair, sector = np.nonzero(inside)
+
+        # deficit of each waked pair and sector (waked pairs x bins), thrust of the upstream turbine at free speed
+        diameter = diameter[pair, 0]
+        expansion = (diameter / (diameter + 2 * self.wake_decay * downwind[pair, sector])) ** 2
+        squared_deficit = ((1 - np.sqrt(1 - self.ct_matrix[up[pair]])) * expansion[:, None]) ** 2
+
+        # sum of squares of all wakes reaching the same turbine in the same sector
+        n_sectors = len(self.directions)
+        target = down[pair] * n_sectors + sector
+        order = np.argsort(target, kind='stable')
+        target = target[order]
+        starts = np.flatnonzero(np.r_[True, target[1:] != target[:-1]]) if target.size else np.zeros(0, dtype=np.int64)
+
+        squared = np.zeros((self.x.size * n_sectors, len(self.speed_vector)))
+        if target.size:
+            squared[target[starts]] = np.add.reduceat(squared_deficit[order], starts, axis=0)
+        self.deficit_matrix = np.minimum(np.sqrt(squared), 1).reshape(self.x.size, n_sectors, -1)
+
+
+    def interpolate_power(self, speed):
+        '''
+        power of each turbine at waked speeds (turbines x sectors x bins), linear interpolation
+        on the uniform speed vector without searching
+        '''
+        position = np.clip(speed / self.step, 0, len(self.speed_vector) - 1)
+        index = np.minimum(position.astype(np.int64), len(self.speed_vector) - 2)
+        fraction = position - index
+
+        n = self.x.size
+        curves = self.power_curve_matrix.reshape(n, 1, -1)
+        low = np.take_along_axis(curves, index.reshape(n, 1, -1), axis=2).reshape(speed.shape)
+        high = np.take_along_axis(curves, (index + 1).reshape(n, 1, -1), axis=2).reshape(speed.shape)
+
+        return low + fraction * (high - low)
+
+
+    def energy(self):
+        '''
+        calculate farm energy production with and without wakes, per turbine and in total
+        '''
+        self.wake_deficit()
+
+        # waked speed at each turbine for each sector and free stream speed bin
+        waked_speed = self.speed_vector[None, None, :] * (1 - self.deficit_matrix)
+        power = self.interpolate_power(waked_speed)
+
+        availability = 1 - self.down_time
+        self.turbine_energy_vector = (power * self.sector_hours_matrix[None]).sum(axis=(1, 2)) * availability
+        self.free_energy_vector = (self.power_curve_matrix @ self.sector_hours_matrix.sum(axis=0)) * availability
+
+        self.energy_production = self.turbine_energy_vector.sum()
+        self.turbine_loss_vector = 1 - self.turbine_energy_vector / self.free_energy_vector
+        self.wake_loss = 1 - self.energy_production / self.free_energy_vector.sum()
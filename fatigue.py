@@ -0,0 +1,196 @@
+from turbine import *
+from constants import *
+
+WOHLER_EXPONENT = 4 # S-N curve slope of the tower steel
+REFERENCE_CYCLES = 1e7 # cycles of the damage equivalent load
+LIFETIME = 20 # years
+TURBULENCE_REFERENCE = 0.16 # IEC class A reference turbulence intensity
+CYCLE_FREQUENCY = 0.1 # Hz, load cycles per second of the turbulent thrust
+
+
+def turning_points(signal):
+    '''
+    peaks and valleys of a signal, keeping the first and last sample
+    '''
+    signal = signal[np.r_[True, signal[1:] != signal[:-1]]]
+    if signal.size < 3:
+        return signal
+
+    slope = np.diff(signal)
+    return signal[np.r_[True, slope[1:] * slope[:-1] < 0, True]]
+
+
+def extract_cycles(points):
+    '''
+    four point rainflow counting on a sequence of turning points: every range smaller than both
+    neighbouring ranges is a full cycle and its two points are removed, for all such ranges at once,
+    until none is left \n
+    returns ranges of the full cycles and the residue
+    '''
+    ranges = []
+    while points.size >= 4:
+        r = np.abs(np.diff(points))
+        inner = np.flatnonzero((r[1:-1] <= r[:-2]) & (r[1:-1] <= r[2:])) + 1
+        if inner.size == 0:
+            break
+
+        # neighbouring candidates share a point, keep the first one
+        inner = inner[np.r_[True, np.diff(inner) > 1]]
+        ranges.append(r[inner])
+
+        keep = np.ones(points.size, dtype=bool)
+        keep[inner] = False
+        keep[inner + 1] = False
+        points = points[keep]
+
+    return (np.concatenate(ranges) if ranges else np.zeros(0)), points
+
+
+class Rainflow():
+    '''
+    class to count rainflow cycles of a long signal in chunks with bounded memory: the residue of
+    each chunk is carried into the next one and counted as half cycles at the end
+    '''
+
+    def __init__(self, exponents=(WOHLER_EXPONENT,), range_edges=None):
+        '''
+        initialize counter with the S-N exponents of the damage sums and optional range histogram edges
+        '''
+        self.exponents = np.asarray(exponents, dtype=np.float64)
+        self.range_edges = None if range_edges is None else np.asarray(range_edges, dtype=np.float64)
+
+        self.residue = np.zeros(0)
+        self.cycles = 0.0
+        self.damage_sums = np.zeros(self.exponents.size)
+        self.histogram = None if range_edges is None else np.zeros(self.range_edges.size - 1)
+        self.finished = False
+
+
+    def count(self, ranges, weight):
+        '''
+        add cycle ranges with a weight of 1 (full) or 0.5 (half cycles)
+        '''
+        self.cycles += weight * ranges.size
+        self.damage_sums += weight * (ranges[:, None] ** self.exponents).sum(axis=0)
+        if self.histogram is not None:
+            self.histogram += weight * np.histogram(ranges, self.range_edges)[0]
+
+
+    def add(self, chunk):
+        '''
+        count the full cycles closed by the next chunk of the signal
+        '''
+        points = turning_points(np.concatenate((self.residue, np.ravel(chunk).astype(np.float64))))
+        ranges, self.residue = extract_cycles(points)
+        self.count(ranges, 1.0)
+
+
+    def finish(self):
+        '''
+        count the ranges of the residue as half cycles
+        '''
+        if not self.finished:
+            self.count(np.abs(np.diff(turning_points(self.residue))), 0.5)
+            self.finished = True
+
+        return self
+
+
+    def damage_equivalent_load(self, reference_cycles=REFERENCE_CYCLES, scale=1):
+        '''
+        constant range load with the same damage in 'reference_cycles' cycles, for each exponent \n
+        input: 'scale' multiplies the counted cycles, e.g. to extrapolate a record to the lifetime
+        '''
+        self.finish()
+        return (scale * self.damage_sums / reference_cycles) ** (1 / self.exponents)
+
+
+class Fatigue():
+    '''
+    class to estimate tower base fatigue loads from the rotor thrust of a designed turbine
+    '''
+
+    def __init__(self, turbine, wohler_exponent=WOHLER_EXPONENT, reference_cycles=REFERENCE_CYCLES, lifetime=LIFETIME):
+        '''
+        initialize fatigue object with a Turbine whose power curve is computed
+        '''
+        self.turbine = turbine
+        self.wohler_exponent = wohler_exponent
+        self.reference_cycles = reference_cycles
+        self.lifetime = lifetime
+
+
+    def thrust(self):
+        '''
+        compute rotor thrust and its slope with speed at each speed bin, from the thrust coefficient
+        of the turbine (Turbine.thrust_coefficient)
+        '''
+        t = self.turbine
+        u = t.speed_vector
+        t.thrust_coefficient()
+        self.ct_vector = t.ct_vector
+        self.thrust_vector = 0.5 * t.rho * t.area * self.ct_vector * u ** 2
+
+        # below rated the thrust grows with u², above rated it falls with 1/u
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(u <= t.speed_rated, 2, -1) * self.thrust_vector / u
+
+        self.thrust_slope_vector = np.where(t.power_curve_vector > 0, slope, 0)
+
+
+    def binned_loads(self, hour_distribution_vector, turbulence_intensity=None, cycle_frequency=CYCLE_FREQUENCY):
+        '''
+        compute damage equivalent thrust and tower base moment over the lifetime from the hours at each
+        speed bin, with the quasi-steady thrust response to turbulence and Rayleigh distributed load ranges \n
+        input: hours per speed bin in one year (Wind.hour_distribution_vector) and turbulence intensity,
+        IEC normal turbulence model of class A when not given
+        '''
+        self.thrust()
+        u = self.turbine.speed_vector
+        m = self.wohler_exponent
+
+        # standard deviation of the wind speed and of the thrust at each bin
+        if turbulence_intensity is None:
+            self.speed_std_vector = TURBULENCE_REFERENCE * (0.75 * u + 5.6)
+        else:
+            self.speed_std_vector = turbulence_intensity * u
+        self.thrust_std_vector = np.abs(self.thrust_slope_vector) * self.speed_std_vector
+
+        # lifetime cycles while the turbine is available and mean of range^m for narrow band gaussian loads
+        hours = hour_distribution_vector * (1 - self.turbine.down_time) * self.lifetime
+        self.cycles_vector = hours * 3600 * cycle_frequency
+        self.range_moment_vector = (2 * np.sqrt(2) * self.thrust_std_vector) ** m * gamma(1 + m/2)
+
+        self.damage_equivalent_thrust = ((self.cycles_vector * self.range_moment_vector).sum() / self.reference_cycles) ** (1/m)
+        self.damage_equivalent_moment = self.damage_equivalent_thrust * self.turbine.height
+
+
+    def time_series_loads(self, chunks, hours, signal='speed'):
+        '''
+        compute damage equivalent tower base moment over the lifetime from a time series read in chunks,
+        with streaming rainflow counting \n
+        input: iterable of arrays, hours covered by the series and 'signal' type: hub height wind speed
+        in m/s (converted with the quasi-steady thrust curve) or tower base moment in N m
+        '''
+        if signal == 'speed':
+            self.thrust()
+        elif signal != 'moment':
+            raise ValueError(f'unknown signal {signal!r}, use speed or moment')
+
+        self.rainflow = Rainflow((self.wohler_exponent,))
+        for chunk in chunks:
+            chunk = np.ravel(chunk)
+            if signal == 'speed':
+                chunk = np.interp(chunk, self.turbine.speed_vector, self.thrust_vector) * self.turbine.height
+            self.rainflow.add(chunk)
+
+        lifetime_scale = self.lifetime * YEAR_HOURS / hours
+        self.damage_equivalent_moment = self.rainflow.damage_equivalent_load(self.reference_cycles, lifetime_scale)[0]
+
+
+    def tower_stress(self, tower):
+        '''
+        compute damage equivalent stress range at the tower base for the governing thickness of a
+        Tower with its steel mass computed
+        '''
+        self.damage_equivalent_stress = self.damage_equivalent_moment / (np.pi * (tower.diameter/2)**2 * tower.thickness)
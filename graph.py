@@ -0,0 +1,199 @@
+from helpers import *
+from constants import *
+from tower import Tower
+
+from collections import Counter
+
+# report values of a design, as in main.DesignResult
+RESULT_NODES = ('hub_speed', 'rated_power', 'speed_cutin', 'speed_rated', 'speed_cutout', 'energy_production',
+                'energy_production_analytic', 'energy_discrepancy', 'full_load_hours', 'average_power',
+                'thickness_gravity', 'thickness_aerodynamic', 'thickness_extreme_wind', 'tower_mass')
+
+
+''' node functions, thin wrappers over the helpers shared with the Wind / Turbine / Tower steps of main.py '''
+
+def speed_vector_node(step):
+    return np.arange(0, 30, step)
+
+
+def hub_speed_node(avg_u_speed, avg_u_height, hub_height, z0):
+    return log_law(avg_u_speed, avg_u_height, hub_height, z0/1000)
+
+
+def hour_distribution_node(speed_vector, k_factor, c_weibull, hours, step):
+    return weibull_pdf(speed_vector, k_factor, c_weibull) * (hours * step)
+
+
+def energy_distribution_node(speed_vector, hour_distribution, rho):
+    return np.multiply(0.5 * rho * (speed_vector ** 3), hour_distribution)
+
+
+def energy_cdf_node(energy_distribution):
+    return cdf(energy_distribution)
+
+
+def design_speed_node(limit):
+    '''
+    node of the speed where the energy cdf crosses 'limit', as in Wind.rated_speed and Wind.cutout_speed
+    '''
+    def speed_node(speed_vector, energy_cdf, k_factor, c_weibull, speed_method):
+        if speed_method == 'analytic':
+            return weibull_energy_speed(limit, k_factor, c_weibull)
+        return binned_energy_speed(speed_vector, energy_cdf, limit)
+
+    return speed_node
+
+
+def area_node(turbine_diameter):
+    return np.pi * (turbine_diameter / 2) ** 2
+
+
+def speed_cutin_node(rho, area, rated_power, cp, dt_efficiency):
+    return rotor_speed(CUTIN_LIMIT * rated_power, rho, area, cp, dt_efficiency)
+
+
+def energy_vector_node(power_curve, hour_distribution, down_time):
+    return np.multiply(power_curve, hour_distribution * (1 - down_time/100))
+
+
+def energy_production_node(energy_vector):
+    return energy_vector.sum()
+
+
+def energy_production_analytic_node(rho, area, cp, dt_efficiency, rated_power, speed_cutin, speed_rated, speed_cutout,
+                                    k_factor, c_weibull, hours, down_time):
+    return hours * (1 - down_time/100) * analytic_energy(rho, area, cp, dt_efficiency, rated_power, speed_cutin,
+                                                         speed_rated, speed_cutout, k_factor, c_weibull)
+
+
+def energy_discrepancy_node(energy_production, energy_production_analytic):
+    return (energy_production - energy_production_analytic) / energy_production_analytic
+
+
+def full_load_hours_node(energy_vector, rated_power):
+    return np.divide(energy_vector, rated_power).sum()
+
+
+def average_power_node(energy_production, hour_distribution):
+    return energy_production / hour_distribution.sum()
+
+
+def tower_node(hub_height, rho, area, rated_power, speed_rated):
+    tower = Tower(hub_height)
+    tower.gravity_load(rated_power)
+    tower.aerodynamic_load(rho, area, speed_rated)
+    tower.extreme_wind_load(rho, area)
+    tower.steel_mass()
+    return tower
+
+
+# derived quantities: name -> (input names, function), inputs are parameters or other nodes
+NODES = {
+    'speed_vector': (('step',), speed_vector_node),
+    'hub_speed': (('avg_u_speed', 'avg_u_height', 'hub_height', 'z0'), hub_speed_node),
+    'c_weibull': (('hub_speed', 'k_factor'), weibull_c),
+    'hour_distribution': (('speed_vector', 'k_factor', 'c_weibull', 'hours', 'step'), hour_distribution_node),
+    'energy_distribution': (('speed_vector', 'hour_distribution', 'rho'), energy_distribution_node),
+    'energy_cdf': (('energy_distribution',), energy_cdf_node),
+    'speed_rated': (('speed_vector', 'energy_cdf', 'k_factor', 'c_weibull', 'speed_method'), design_speed_node(RATED_LIMIT)),
+    'speed_cutout': (('speed_vector', 'energy_cdf', 'k_factor', 'c_weibull', 'speed_method'), design_speed_node(CUTOUT_LIMIT)),
+    'area': (('turbine_diameter',), area_node),
+    'rated_power': (('rho', 'area', 'speed_rated', 'cp', 'dt_efficiency'), rotor_power),
+    'speed_cutin': (('rho', 'area', 'rated_power', 'cp', 'dt_efficiency'), speed_cutin_node),
+    'power_curve': (('speed_vector', 'rho', 'area', 'cp', 'dt_efficiency', 'rated_power', 'speed_cutin', 'speed_cutout'),
+                    cubic_power_curve),
+    'energy_vector': (('power_curve', 'hour_distribution', 'down_time'), energy_vector_node),
+    'energy_production': (('energy_vector',), energy_production_node),
+    'energy_production_analytic': (('rho', 'area', 'cp', 'dt_efficiency', 'rated_power', 'speed_cutin', 'speed_rated',
+                                    'speed_cutout', 'k_factor', 'c_weibull', 'hours', 'down_time'),
+                                   energy_production_analytic_node),
+    'energy_discrepancy': (('energy_production', 'energy_production_analytic'), energy_discrepancy_node),
+    'full_load_hours': (('energy_vector', 'rated_power'), full_load_hours_node),
+    'average_power': (('energy_production', 'hour_distribution'), average_power_node),
+    'tower': (('hub_height', 'rho', 'area', 'rated_power', 'speed_rated'), tower_node),
+    'thickness_gravity': (('tower',), lambda tower: tower.thickness_gravity),
+    'thickness_aerodynamic': (('tower',), lambda tower: tower.thickness_aerodynamic),
+    'thickness_extreme_wind': (('tower',), lambda tower: tower.thickness_extreme_wind),
+    'tower_mass': (('tower',), lambda tower: tower.mass),
+}
+
+
+class DesignGraph():
+    '''
+    class to evaluate one design lazily: each node is computed when first read and recomputed only
+    when one of its inputs changed; a recomputed node with an unchanged value does not invalidate
+    the nodes that use it
+    '''
+
+    def __init__(self, params, step=WIND_STEP, hours=YEAR_HOURS, rho=RHO, speed_method=SPEED_METHOD, nodes=NODES):
+        '''
+        initialize graph with project.json parameters (same units) and the model settings
+        '''
+        self.nodes = nodes
+        self.values = {}
+        self.versions = Counter()
+        self.seen = {} # input versions each node was computed from
+        self.evaluations = Counter()
+        self.clock = 0 # number of updates, nodes checked since the last one are up to date
+        self.checked = {}
+
+        self.update(step=step, hours=hours, rho=rho, speed_method=speed_method)
+        self.update(**{key: float(value) for key, value in params.items()})
+
+
+    def update(self, **params):
+        '''
+        set parameters, only the nodes depending on the ones that changed are recomputed on the next read
+        '''
+        for name, value in params.items():
+            if name in self.nodes:
+                raise KeyError(f'{name} is a derived quantity, not a parameter')
+            if name not in self.values or not np.array_equal(self.values[name], value):
+                self.values[name] = value
+                self.versions[name] += 1
+                self.clock += 1
+
+
+    def __getitem__(self, name):
+        '''
+        value of a parameter or node, bringing the node and its inputs up to date
+        '''
+        if name not in self.nodes or self.checked.get(name) == self.clock:
+            return self.values[name]
+
+        inputs, function = self.nodes[name]
+        arguments = [self[key] for key in inputs]
+        versions = tuple(self.versions[key] for key in inputs)
+
+        if self.seen.get(name) != versions:
+            value = function(*arguments)
+            self.evaluations[name] += 1
+            self.seen[name] = versions
+
+            # early cutoff: an unchanged value keeps its version
+            if name not in self.values or not np.array_equal(self.values[name], value):
+                self.values[name] = value
+                self.versions[name] += 1
+
+        self.checked[name] = self.clock
+        return self.values[name]
+
+
+    def stale(self):
+        '''
+        names of the nodes that may be recomputed on their next read (NODES is in dependency order)
+        '''
+        stale = set()
+        for name, (inputs, _) in self.nodes.items():
+            if self.seen.get(name) != tuple(self.versions[key] for key in inputs) \
+                    or any(key in stale for key in inputs):
+                stale.add(name)
+
+        return stale
+
+
+    def result(self, names=RESULT_NODES):
+        '''
+        values of the report nodes as a dict of floats
+        '''
+        return {name: float(self[name]) for name in names}
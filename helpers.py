@@ -1,6 +1,16 @@
 # import needed libraries
 import numpy as np
 
+from scipy.special import gamma, gammainc, gammaincinv
+
+def log_law(speed, height, h, z0):
+    '''
+    shear wind 'speed' measured at 'height' to height 'h' with the logarithmic profile
+    of surface roughness 'z0'; works on scalars and arrays
+    '''
+    return speed * (np.log(h / z0) / np.log(height / z0))
+
+
 def weibull_pdf(u_vector, k, c):
     '''
     calculate weibull probability of wind speed VECTOR 'u_vector'
@@ -17,9 +27,160 @@ def weibull_cdf(u_vector, k, c):
     return 1 - np.exp(-(u_vector/c) ** k)
 
 
-def cdf(u_vector):
+def weibull_partial_moment(u_vector, k, c, n):
+    '''
+    calculate the n-th partial moment of the weibull distribution, the integral of
+    u^n * pdf(u) from 0 to each speed of 'u_vector', with the regularized incomplete gamma function
+    '''
+    s = 1 + n/k
+    return (c ** n) * gamma(s) * gammainc(s, (u_vector/c) ** k)
+
+
+def weibull_c(mean, k):
+    '''
+    weibull 'c' (scale) parameter of a distribution with mean wind speed 'mean' and shape 'k'
+    '''
+    return mean / gamma(1 + 1/k)
+
+
+def weibull_energy_speed(limit, k, c):
+    '''
+    solve for the wind speed where the weibull energy cdf (normalized third partial moment)
+    crosses 'limit', inverting the regularized incomplete gamma function; works on arrays of sites
+    '''
+    return c * gammaincinv(1 + 3/k, limit) ** (1/k)
+
+
+def rotor_power(rho, area, speed, cp, efficiency):
+    '''
+    electric power of a rotor of swept 'area' at wind 'speed', with power coefficient 'cp'
+    and drive train 'efficiency'; works on scalars and arrays
+    '''
+    return 0.5 * rho * area * (speed ** 3) * cp * efficiency
+
+
+def rotor_speed(power, rho, area, cp, efficiency):
+    '''
+    wind speed where the rotor produces 'power', inverse of rotor_power
+    '''
+    return (2 * power / (rho * area * cp * efficiency)) ** (1/3)
+
+
+def cubic_power_curve(u_vector, rho, area, cp, efficiency, rated_power, speed_cutin, speed_cutout):
+    '''
+    power at each wind speed of 'u_vector': stopped below cut-in, cubic up to rated power
+    and stopped again from cut-out speed on; parameters may be arrays broadcast against 'u_vector'
+    '''
+    power = rotor_power(rho, area, u_vector, cp, efficiency)
+    power = np.where(u_vector < speed_cutin, 0, power)
+    power = np.where(power >= rated_power, rated_power, power)
+
+    return np.where(u_vector >= speed_cutout, 0, power)
+
+
+def analytic_energy(rho, area, cp, efficiency, rated_power, speed_cutin, speed_rated, speed_cutout, k, c):
     '''
-    calculate cummulative distribution function of the u_vector and returns a vector
+    integrate the power curve (cubic from cut-in to rated speed, rated power up to cut-out speed)
+    exactly over the weibull distribution, the energy in Wh per hour of the period;
+    works on scalars and arrays of designs or sectors
     '''
-    return np.array([sum(u_vector[:x+1]) / sum(u_vector) 
-            for x in range(0, len(u_vector))])
\ No newline at end of file
+    power_factor = 0.5 * rho * area * cp * efficiency
+    speed_cutin = np.minimum(speed_cutin, speed_rated)
+
+    # cubic region between cut-in and rated speed
+    cubic_energy = power_factor * (weibull_partial_moment(speed_rated, k, c, 3)
+                                   - weibull_partial_moment(speed_cutin, k, c, 3))
+
+    # flat region at rated power between rated and cut-out speed
+    rated_energy = rated_power * (weibull_cdf(speed_cutout, k, c) - weibull_cdf(speed_rated, k, c))
+
+    return cubic_energy + rated_energy
+
+
+def cdf(u_vector, axis=-1):
+    '''
+    calculate cummulative distribution function of the u_vector and returns a vector \n
+    for 2-D batches the distribution is computed along 'axis'
+    '''
+    cumulative = np.cumsum(u_vector, axis=axis, dtype=np.float64)
+
+    # the last cumulative value is the total of the distribution
+    total = np.take(cumulative, [-1], axis=axis)
+
+    return cumulative / total
+
+
+def cdf_crossing(cdf_vector, limit, axis=-1):
+    '''
+    index of the first bin where the (non-decreasing) cdf_vector is above 'limit' \n
+    returns the number of bins when the limit is never crossed
+    '''
+    if np.ndim(cdf_vector) == 1:
+        return np.searchsorted(cdf_vector, limit, side='right')
+
+    return np.sum(cdf_vector <= limit, axis=axis)
+
+
+def binned_energy_speed(u_vector, cdf_vector, limit, axis=-1):
+    '''
+    speed of the bin after the one where the energy cdf crosses 'limit' (interception bin + 1),
+    the last speed when the limit is crossed in the last bin; works on 2-D batches along 'axis'
+    '''
+    index = np.minimum(cdf_crossing(cdf_vector, limit, axis) + 1, np.size(u_vector) - 1)
+    return u_vector[index]
+
+
+class RunningCdf():
+    '''
+    cummulative distribution function that can be extended with new bins
+    without recomputing the bins already seen
+    '''
+
+    def __init__(self, u_vector=None, capacity=64):
+        '''
+        initialize with an optional first block of bins
+        '''
+        self._buffer = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+        self.total = 0.0
+
+        if u_vector is not None:
+            self.append(u_vector)
+
+
+    def append(self, u_vector):
+        '''
+        add new bins at the end of the distribution
+        '''
+        u_vector = np.ravel(u_vector)
+        end = self.size + u_vector.size
+
+        # grow the buffer geometrically so appending stays linear overall
+        if end > self._buffer.size:
+            buffer = np.empty(max(end, 2 * self._buffer.size), dtype=np.float64)
+            buffer[:self.size] = self._buffer[:self.size]
+            self._buffer = buffer
+
+        block = self._buffer[self.size:end]
+        np.cumsum(u_vector, out=block)
+        block += self.total
+
+        if u_vector.size:
+            self.total = block[-1]
+        self.size = end
+
+
+    @property
+    def cumulative_vector(self):
+        '''
+        non normalized cummulative sum of all bins appended so far
+        '''
+        return self._buffer[:self.size]
+
+
+    @property
+    def cdf_vector(self):
+        '''
+        normalized cummulative distribution of all bins appended so far
+        '''
+        return self.cumulative_vector / self.total
@@ -0,0 +1,131 @@
+from batch import *
+from main import load_params
+
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# input uncertainties in project.json units: (distribution, spread)
+# 'normal' spread is the standard deviation, 'uniform' spread is the half width
+UNCERTAINTIES = {
+    'avg_u_speed': ('normal', 0.32), # m/s, about 5 %
+    'k_factor': ('normal', 0.1),
+    'z0': ('uniform', 100), # mm
+    'down_time': ('uniform', 2), # %
+    'cp': ('normal', 0.01),
+}
+
+# physical limits the samples are clipped to
+BOUNDS = {
+    'avg_u_speed': (0.1, np.inf),
+    'k_factor': (1.0, 5.0),
+    'z0': (0.1, np.inf),
+    'down_time': (0, 100),
+    'cp': (0.01, 16/27), # Betz limit
+}
+
+# exceedance levels reported, P90 is exceeded with 90 % probability
+LEVELS = (50, 75, 90)
+
+
+def sample_parameters(base, uncertainties, n, rng):
+    '''
+    draw 'n' parameter sets around the 'base' project parameters \n
+    returns dict of project.json parameters with arrays for the uncertain keys
+    '''
+    params = dict(base)
+    for key, (distribution, spread) in uncertainties.items():
+        center = float(base[key])
+        if distribution == 'normal':
+            values = rng.normal(center, spread, n)
+        elif distribution == 'uniform':
+            values = rng.uniform(center - spread, center + spread, n)
+        else:
+            raise ValueError(f'unknown distribution {distribution!r} for {key}')
+        params[key] = np.clip(values, *BOUNDS.get(key, (-np.inf, np.inf)))
+
+    return params
+
+
+def evaluate_chunk(task):
+    '''
+    sample and evaluate one chunk in a worker, returns the energy production of each sample
+    '''
+    base, uncertainties, n, seed, energy_key, options = task
+
+    rng = np.random.default_rng(seed)
+    params = sample_parameters(base, uncertainties, n, rng)
+
+    return design_batch(params, vectors=False, **options)[energy_key]
+
+
+def exceedance(values, levels=LEVELS):
+    '''
+    values exceeded with each probability of 'levels' (in %)
+    '''
+    return dict(zip((f'P{level}' for level in levels), np.quantile(values, 1 - np.asarray(levels) / 100)))
+
+
+def monte_carlo(n_samples, base=None, uncertainties=UNCERTAINTIES, seed=0, chunk_size=100_000, workers=1,
+                aep_method=AEP_METHOD, levels=LEVELS, **options):
+    '''
+    propagate input uncertainties to the annual energy production with seeded sampling, evaluating
+    design_batch over the samples in chunks (optionally on a process pool) \n
+    the result does not depend on the number of workers: each chunk has its own seed derived from 'seed' \n
+    returns dict with mean, standard deviation, exceedance values and convergence diagnostics
+    '''
+    if base is None:
+        base = load_params()
+
+    energy_key = 'energy_production' if aep_method == 'binned' else 'energy_production_analytic'
+    sizes = [min(chunk_size, n_samples - start) for start in range(0, n_samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(base, uncertainties, size, chunk_seed, energy_key, options) for size, chunk_seed in zip(sizes, seeds)]
+
+    if workers == 1:
+        chunks = list(map(evaluate_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            chunks = list(executor.map(evaluate_chunk, tasks))
+
+    energy = np.concatenate(chunks)
+
+    # running estimates after each chunk show whether the sample count is enough
+    convergence = []
+    for end in np.cumsum(sizes):
+        running = energy[:end]
+        convergence.append(dict(samples=int(end), mean=running.mean(), **exceedance(running, levels)))
+
+    # spread of the estimates between chunks gives their standard error
+    standard_error = {'mean': energy.std(ddof=1) / np.sqrt(energy.size) if energy.size > 1 else np.nan}
+    if len(chunks) > 1:
+        per_chunk = [exceedance(chunk, levels) for chunk in chunks]
+        for name in per_chunk[0]:
+            standard_error[name] = np.std([values[name] for values in per_chunk], ddof=1) / np.sqrt(len(chunks))
+
+    result = dict(samples=energy.size, mean=energy.mean(), std=energy.std(), **exceedance(energy, levels))
+    result['standard_error'] = standard_error
+    result['convergence'] = convergence
+
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='monte carlo uncertainty of the annual energy production')
+    parser.add_argument('--samples', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print the full result as json')
+    args = parser.parse_args()
+
+    result = monte_carlo(args.samples, seed=args.seed, chunk_size=args.chunk_size, workers=args.workers)
+
+    if args.json:
+        print(json.dumps(result, indent=4, default=float))
+    else:
+        print(f'{result["samples"]} samples, mean {result["mean"]/1000000:.2f} MWh, std {result["std"]/1000000:.2f} MWh')
+        for level in LEVELS:
+            name = f'P{level}'
+            error = result['standard_error'].get(name, np.nan)
+            print(f'{name}: {result[name]/1000000:.2f} MWh (standard error {error/1000000:.2f} MWh)')
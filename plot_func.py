@@ -1,24 +1,93 @@
-# import needed libraries
-import matplotlib.pyplot as plt
-
-import matplotlib.ticker as plt_tick
-from matplotlib.ticker import MaxNLocator
-PX = 1/plt.rcParams['figure.dpi']  # pixel in inches
-plt.rcParams["font.family"] = "Times New Roman"
-FONT_SIZE = 16
-
+# import needed libraries, matplotlib is only imported when a figure is drawn
 import os
+import sys
+import atexit
+from concurrent.futures import ProcessPoolExecutor
 
 from helpers import np
 
+FONT_SIZE = 16
+
 figures_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'images')
 
-def plot_wind_resource(u_vector, duration_vector, energy_vector):
+# rendering options, see set_render_mode
+HEADLESS = False
+FORMATS = ('svg',)
+
+# worker processes shared by render_all calls, see render_pool
+_pool = None
+_pool_workers = None
+
+
+def set_render_mode(headless=False, formats=('svg',)):
+    '''
+    choose between interactive windows and headless rendering (Agg backend, no plt.show) \n
+    input: headless flag and file formats saved for each figure, e.g. ('png', 'svg')
+    '''
+    global HEADLESS, FORMATS
+    HEADLESS = headless
+    FORMATS = tuple(formats)
+
+
+def restore_render_mode(headless, formats):
+    '''
+    go back to a previous render mode after rendering headless in this process, including the
+    matplotlib backend that pyplot switched to Agg
+    '''
+    set_render_mode(headless, formats)
+
+    if not headless and 'matplotlib.pyplot' in sys.modules:
+        import matplotlib
+        sys.modules['matplotlib.pyplot'].switch_backend(matplotlib.rcParamsOrig['backend'])
+
+
+def pyplot():
+    '''
+    import matplotlib on first use and return pyplot and ticker modules
+    '''
+    import matplotlib
+    if HEADLESS:
+        matplotlib.use('Agg')
+
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as plt_tick
+    plt.rcParams["font.family"] = "Times New Roman"
+
+    return plt, plt_tick
+
+
+def new_figure(name):
+    '''
+    create a 1280x720 px figure, reusing the figure of the same name if it is still open
+    '''
+    plt, _ = pyplot()
+    px = 1/plt.rcParams['figure.dpi']  # pixel in inches
+
+    return plt.subplots(figsize=(1280*px, 720*px), num=name, clear=True)
+
+
+def save_figure(name, directory=None):
+    '''
+    save current figure in every format of FORMATS and show it unless rendering headless
+    '''
+    plt, _ = pyplot()
+    directory = figures_dir if directory is None else directory
+
+    for extension in FORMATS:
+        plt.savefig(os.path.join(directory, f'{name}.{extension}'))
+
+    if not HEADLESS:
+        plt.show()
+
+
+def plot_wind_resource(u_vector, duration_vector, energy_vector, directory=None):
     ''' 
     plot on the same chart the speed vector in the x axis and
     speed anual duration in the first y axis and the energy per area on the second y axis
     '''
-    fig, ax1 = plt.subplots(figsize=(1280*PX, 720*PX))
+    plt, plt_tick = pyplot()
+
+    fig, ax1 = new_figure('wind_resource')
 
     color = 'tab:gray'
     ax1.set_ylabel('Duration [h/year]', color=color, fontsize = FONT_SIZE)
@@ -47,16 +116,17 @@ def plot_wind_resource(u_vector, duration_vector, energy_vector):
     plt.grid(alpha=0.25)
     fig.tight_layout()
     
-    plt.savefig(os.path.join(figures_dir, 'wind_resource.svg'))
-    plt.show()
+    save_figure('wind_resource', directory)
 
-def plot_wind_cdf(u_vector, cdf_vector, limits):
+def plot_wind_cdf(u_vector, cdf_vector, limits, directory=None):
     ''' 
     plot wind resources cdf 
     '''
+    plt, plt_tick = pyplot()
+
     rated, cut_out = limits[0], limits[1]
 
-    fig, ax = plt.subplots(figsize=(1280*PX, 720*PX))
+    fig, ax = new_figure('wind_cdf')
 
     # plot cdf curve
     color = (0, 0, 0)
@@ -83,17 +153,18 @@ def plot_wind_cdf(u_vector, cdf_vector, limits):
     fig.tight_layout()
 
     # export as png
-    plt.savefig(os.path.join(figures_dir, 'wind_cdf.svg'))
-    plt.show()
+    save_figure('wind_cdf', directory)
 
-def plot_turbine_curve(u_vector, power_vector, limits):
+def plot_turbine_curve(u_vector, power_vector, limits, directory=None):
     ''' 
     plot turbine characteristic power curve with cut-in, rated and cut-out
     '''
+    plt, plt_tick = pyplot()
+
     cut_in, rated, cut_out = limits[0], limits[1], limits[2]
     rated_power = max(power_vector)
 
-    fig, ax = plt.subplots(figsize=(1280*PX, 720*PX))
+    fig, ax = new_figure('turbine_power_curve')
 
     # plot power curve
     color = (0, 0, 0)
@@ -178,16 +249,17 @@ def plot_turbine_curve(u_vector, power_vector, limits):
     fig.tight_layout()
 
     # export as png
-    plt.savefig(os.path.join(figures_dir, 'turbine_power_curve.svg'))
-    plt.show()
+    save_figure('turbine_power_curve', directory)
     
 
-def plot_turbine_energy_production(u_vector, turbine_energy_vector, wind_energy_vector):
+def plot_turbine_energy_production(u_vector, turbine_energy_vector, wind_energy_vector, directory=None):
     ''' 
     plot on the same chart the speed vector in the x axis and
     turbine anual energy production and the available wind energy
     '''
-    fig, ax = plt.subplots(figsize=(1280*PX, 720*PX))
+    plt, plt_tick = pyplot()
+
+    fig, ax = new_figure('energy_production')
 
     color = (0, 0, 0)
     ax.set_ylabel('Energy [kWh/year]', color=color, fontsize = FONT_SIZE)
@@ -211,5 +283,63 @@ def plot_turbine_energy_production(u_vector, turbine_energy_vector, wind_energy_
     plt.grid(alpha=0.25)
     fig.tight_layout()
 
-    plt.savefig(os.path.join(figures_dir, 'energy_production.svg'))
-    plt.show()
\ No newline at end of file
+    save_figure('energy_production', directory)
+
+# figures that can be rendered by name
+PLOTS = {
+    'wind_resource': plot_wind_resource,
+    'wind_cdf': plot_wind_cdf,
+    'turbine_power_curve': plot_turbine_curve,
+    'energy_production': plot_turbine_energy_production,
+}
+
+
+def render_figure(task):
+    '''
+    render one figure headless, task is (figure name, args, kwargs, formats)
+    '''
+    name, args, kwargs, formats = task
+    set_render_mode(True, formats)
+    PLOTS[name](*args, **kwargs)
+
+
+def render_pool(workers=None):
+    '''
+    process pool kept between render_all calls, so workers start (and import matplotlib) once;
+    it is replaced when a different number of workers is asked and shut down at exit
+    '''
+    global _pool, _pool_workers
+
+    if _pool is None or workers != _pool_workers:
+        if _pool is not None:
+            _pool.shutdown()
+        else:
+            atexit.register(lambda: _pool.shutdown())
+        _pool = ProcessPoolExecutor(workers)
+        _pool_workers = workers
+
+    return _pool
+
+
+def render_all(jobs, workers=None, formats=None, executor=None):
+    '''
+    render figures concurrently in worker processes, always headless; each worker reuses
+    its figures between jobs \n
+    input: list of (figure name, args) or (figure name, args, kwargs) with names of PLOTS,
+    e.g. ('wind_cdf', (u_vector, cdf_vector, limits), {'directory': path}); the figures are
+    rendered in a caller-owned 'executor' when given, in the shared render_pool otherwise
+    '''
+    formats = FORMATS if formats is None else tuple(formats)
+    tasks = [(job[0], job[1], job[2] if len(job) > 2 else {}, formats) for job in jobs]
+
+    if executor is None and workers == 1:
+        # render_figure switches this process to headless, the caller's mode is restored afterwards
+        previous = HEADLESS, FORMATS
+        try:
+            for task in tasks:
+                render_figure(task)
+        finally:
+            restore_render_mode(*previous)
+    else:
+        executor = render_pool(workers) if executor is None else executor
+        list(executor.map(render_figure, tasks))
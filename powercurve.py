@@ -0,0 +1,119 @@
+from helpers import *
+from constants import *
+
+RESOLUTION = 0.01 # m/s, speed step of the analytic curve points
+MAX_CELLS = 1 << 16 # cells of the lookup table
+MAX_CORRECTIONS = 4 # segment steps within a cell before searching
+
+
+class PowerCurve():
+    '''
+    class to represent a continuous power curve, linear between its points, with zero power below
+    cut-in and from cut-out speed on, evaluated on speed arrays with a uniform-grid lookup table
+    '''
+
+    def __init__(self, speed, power, speed_cutin=None, speed_cutout=None):
+        '''
+        initialize power curve from tabulated points (e.g. a manufacturer curve) \n
+        input: increasing speeds in m/s, power in W, and cut-in / cut-out speeds
+        (first and last tabulated speeds when not given)
+        '''
+        self.speed = np.asarray(speed, dtype=np.float64)
+        self.power = np.asarray(power, dtype=np.float64)
+        if self.speed.ndim != 1 or self.speed.size < 2 or np.any(np.diff(self.speed) <= 0):
+            raise ValueError('power curve speeds must be a strictly increasing 1-D array')
+
+        self.speed_cutin = self.speed[0] if speed_cutin is None else speed_cutin
+        self.speed_cutout = self.speed[-1] if speed_cutout is None else speed_cutout
+
+        self.lookup_table()
+
+
+    @classmethod
+    def analytic(cls, rho, area, cp, global_efficiency, rated_power, speed_cutin, speed_cutout, resolution=RESOLUTION):
+        '''
+        create the analytic curve of Turbine.power_curve (cubic up to rated power) sampled every
+        'resolution' m/s, with the rated speed as an exact point
+        '''
+        coefficient = 0.5 * rho * area * cp * global_efficiency
+        speed_rated = (rated_power / coefficient) ** (1/3)
+
+        # grid points too close to the exact ones would make the lookup table needlessly fine
+        exact = np.array([speed_rated, speed_cutout])
+        grid = np.arange(0, speed_cutout, resolution)
+        grid = grid[np.abs(grid[:, None] - exact).min(axis=1) > resolution / 4]
+        speed = np.union1d(grid, exact)
+        power = np.minimum(coefficient * speed ** 3, rated_power)
+
+        return cls(speed, power, speed_cutin, speed_cutout)
+
+
+    @classmethod
+    def from_turbine(cls, turbine, resolution=RESOLUTION):
+        '''
+        create the analytic curve of a Turbine with its power curve computed
+        '''
+        return cls.analytic(turbine.rho, turbine.area, turbine.cp, turbine.global_efficiency,
+                            turbine.rated_power, turbine.speed_cutin, turbine.speed_cutout, resolution)
+
+
+    def lookup_table(self):
+        '''
+        precompute a uniform grid over the curve points: each grid cell stores the curve segment at its
+        left edge; the step is half the median point spacing, with at most MAX_CELLS cells, so cells
+        with more points (e.g. a vertical drop at cut-out) are corrected with a few comparisons
+        '''
+        self.grid_start = self.speed[0]
+        span = self.speed[-1] - self.grid_start
+        self.grid_step = max(np.median(np.diff(self.speed)) / 2, span / (MAX_CELLS - 1))
+        n_cells = int(np.ceil(span / self.grid_step)) + 1
+
+        edges = self.grid_start + np.arange(n_cells + 1) * self.grid_step
+        segments = np.clip(np.searchsorted(self.speed, edges, side='right') - 1, 0, self.speed.size - 2)
+        self.segment_table = segments[:-1]
+
+        # points inside each cell, the segment may move that many times to the right
+        self.cell_points = segments[1:] - segments[:-1]
+        self.corrections = min(int(self.cell_points.max()), MAX_CORRECTIONS)
+
+        # value and slope of each segment
+        self.slope = np.diff(self.power) / np.diff(self.speed)
+
+
+    def __call__(self, speed, out=None):
+        '''
+        power at each speed of a scalar or an array, same as np.interp on the curve points
+        but without a binary search per speed
+        '''
+        speed = np.asarray(speed, dtype=np.float64)
+        values = np.atleast_1d(speed)
+        # fmax / fmin also replace missing values (nan), which are masked below
+        clipped = np.fmin(np.fmax(values, self.speed[0]), self.speed[-1])
+
+        cell = np.minimum(((clipped - self.grid_start) * (1 / self.grid_step)).astype(np.int64), self.segment_table.size - 1)
+        segment = self.segment_table[cell]
+        for _ in range(self.corrections):
+            segment += (clipped >= self.speed[segment + 1]) & (segment < self.speed.size - 2)
+
+        # the few speeds in cells with more points than corrections are searched
+        crowded = self.cell_points[cell] > self.corrections
+        if crowded.any():
+            segment[crowded] = np.clip(np.searchsorted(self.speed, clipped[crowded], side='right') - 1, 0, self.speed.size - 2)
+
+        position = clipped - self.speed[segment]
+        power = self.power[segment] + self.slope[segment] * position
+
+        # stopped below cut-in and from cut-out on, as in Turbine.power_curve
+        power = np.where((values >= self.speed_cutin) & (values < self.speed_cutout), power, 0).reshape(speed.shape)
+
+        if out is None:
+            return power[()]
+        out[...] = power
+        return out
+
+
+    def energy(self, speed, sample_hours, down_time=0):
+        '''
+        energy in Wh of a series of speeds, each sample lasting 'sample_hours'
+        '''
+        return self(speed).sum() * sample_hours * (1 - down_time)
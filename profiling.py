@@ -0,0 +1,203 @@
+import sys
+import json
+import time
+import marshal
+import functools
+import tracemalloc
+from contextlib import nullcontext
+
+# profiler receiving the sections, None when profiling is off
+ACTIVE = None
+NO_SECTION = nullcontext()
+
+
+def section(name):
+    '''
+    context manager timing a block of code under 'name' when a Profiler is active,
+    a shared no-op context otherwise
+    '''
+    if ACTIVE is None:
+        return NO_SECTION
+    return ACTIVE.section(name)
+
+
+class Section():
+    '''
+    class to time one entry of a profiled block
+    '''
+
+    def __init__(self, profiler, name, location):
+        self.profiler = profiler
+        self.name = name
+        self.location = location
+
+
+    def __enter__(self):
+        self.profiler.enter()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.profiler.exit(self.name, self.location)
+        return False
+
+
+class Profiler():
+    '''
+    class to record call counts, wall time and allocated bytes of Wind/Turbine methods
+    and of the sections of the design pipeline
+    '''
+
+    def __init__(self, memory=False):
+        '''
+        initialize empty profiler, 'memory' enables allocation tracing (slower)
+        '''
+        self.memory = memory
+        # name -> [calls, total time, own time, allocated bytes, location]
+        self.stats = {}
+        self.stack = []
+        self.patched = []
+
+
+    def section(self, name, location=None):
+        '''
+        context manager timing a block under 'name'
+        '''
+        return Section(self, name, location or ('~', 0, name))
+
+
+    def enter(self):
+        '''
+        start timing a nested entry
+        '''
+        start_bytes = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # keep the peak of the enclosing entry before measuring this one
+            if self.stack:
+                self.stack[-1][3] = max(self.stack[-1][3], peak)
+            tracemalloc.reset_peak()
+            start_bytes = current
+
+        # start time, time spent in children, start bytes, running peak
+        self.stack.append([time.perf_counter(), 0.0, start_bytes, start_bytes])
+
+
+    def exit(self, name, location):
+        '''
+        stop timing the innermost entry and add it to the stats of 'name'
+        '''
+        start, children, start_bytes, running_peak = self.stack.pop()
+        elapsed = time.perf_counter() - start
+
+        allocated = 0
+        if self.memory:
+            peak = max(running_peak, tracemalloc.get_traced_memory()[1])
+            allocated = peak - start_bytes
+            if self.stack:
+                self.stack[-1][3] = max(self.stack[-1][3], peak)
+
+        if self.stack:
+            self.stack[-1][1] += elapsed
+
+        entry = self.stats.setdefault(name, [0, 0.0, 0.0, 0, location])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] += elapsed - children
+        entry[3] = max(entry[3], allocated)
+
+
+    def wrap(self, function, name):
+        '''
+        return 'function' timed under 'name'
+        '''
+        code = function.__code__
+        location = (code.co_filename, code.co_firstlineno, code.co_name)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Section(self, name, location):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+
+    def instrument(self, *classes):
+        '''
+        time every public method of 'classes' until restore is called
+        '''
+        for cls in classes:
+            for attribute, value in list(vars(cls).items()):
+                if callable(value) and not attribute.startswith('_'):
+                    self.patched.append((cls, attribute, value))
+                    setattr(cls, attribute, self.wrap(value, f'{cls.__name__}.{attribute}'))
+
+
+    def restore(self):
+        '''
+        put back the original methods
+        '''
+        for cls, attribute, value in reversed(self.patched):
+            setattr(cls, attribute, value)
+        self.patched = []
+
+
+    def __enter__(self):
+        '''
+        activate sections and instrument Wind and Turbine
+        '''
+        global ACTIVE
+        from turbine import Wind, Turbine
+
+        if self.memory:
+            tracemalloc.start()
+        self.instrument(Wind, Turbine)
+        ACTIVE = self
+        return self
+
+
+    def __exit__(self, *exc):
+        global ACTIVE
+        ACTIVE = None
+        self.restore()
+        if self.memory:
+            tracemalloc.stop()
+        return False
+
+
+    def report(self):
+        '''
+        stats as a list of dicts sorted by total time
+        '''
+        rows = [{'name': name, 'calls': calls, 'total_time': total, 'own_time': own, 'allocated_bytes': allocated}
+                for name, (calls, total, own, allocated, _) in self.stats.items()]
+        return sorted(rows, key=lambda row: row['total_time'], reverse=True)
+
+
+    def to_json(self, path):
+        '''
+        write the report to a json file
+        '''
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=4)
+
+
+    def print_stats(self, file=sys.stdout):
+        '''
+        print the stats in the layout of cProfile
+        '''
+        print(f'{"ncalls":>9} {"tottime":>9} {"percall":>9} {"cumtime":>9} {"percall":>9} {"allocated":>11} name', file=file)
+        for row in self.report():
+            calls = row['calls']
+            print(f'{calls:>9} {row["own_time"]:9.6f} {row["own_time"]/calls:9.6f} {row["total_time"]:9.6f} '
+                  f'{row["total_time"]/calls:9.6f} {row["allocated_bytes"]:>11} {row["name"]}', file=file)
+
+
+    def dump_stats(self, path):
+        '''
+        write the stats in the marshal format of cProfile, readable with pstats.Stats(path)
+        '''
+        stats = {location: (calls, calls, own, total, {})
+                 for calls, total, own, _, location in self.stats.values()}
+        with open(path, 'wb') as file:
+            marshal.dump(stats, file)
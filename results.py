@@ -0,0 +1,187 @@
+from batch import *
+
+import os
+import json
+
+# scalar outputs of design_batch kept for every design
+RESULT_KEYS = ('hub_speed', 'c_weibull', 'speed_rated', 'speed_cutout', 'speed_cutin', 'area', 'rated_power',
+               'energy_production', 'energy_production_analytic', 'energy_discrepancy', 'full_load_hours',
+               'average_power', 'thickness_gravity', 'thickness_aerodynamic', 'thickness_extreme_wind', 'tower_mass')
+# per bin outputs of design_batch that can be kept
+VECTOR_KEYS = ('hour_distribution', 'energy_distribution', 'energy_cdf', 'power_curve', 'energy_vector')
+
+
+class DesignView():
+    '''
+    class to read one design of a ResultStore as attributes, without copying its values
+    '''
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+
+    def __getattr__(self, name):
+        # unset while copying or unpickling, looking them up in the store would recurse
+        if name in ('store', 'index') or name.startswith('__'):
+            raise AttributeError(name)
+        if name in self.store.vectors:
+            return self.store.vectors[name][self.index]
+        try:
+            return self.store.table[name][self.index]
+        except ValueError:
+            raise AttributeError(name) from None
+
+
+    def as_dict(self):
+        '''
+        scalar values of the design
+        '''
+        return {name: float(self.store.table[name][self.index]) for name in self.store.columns}
+
+
+    def __repr__(self):
+        return f'DesignView({self.index}, ' + ', '.join(f'{k}={v:g}' for k, v in self.as_dict().items()) + ')'
+
+
+class ResultStore():
+    '''
+    class to hold many designs as columns: one structured array for parameters and scalar
+    outputs and optional (designs x bins) arrays for per bin outputs
+    '''
+
+    def __init__(self, table, vectors=None, speed_vector=None):
+        '''
+        initialize store from a structured array and a dict of per bin arrays
+        '''
+        self.table = table
+        self.vectors = vectors or {}
+        self.speed_vector = speed_vector
+
+
+    @classmethod
+    def from_columns(cls, columns, vectors=None, speed_vector=None):
+        '''
+        create store from a dict of equally long 1-D arrays
+        '''
+        names = list(columns)
+        n = len(columns[names[0]]) if names else 0
+        table = np.empty(n, dtype=[(name, np.float64) for name in names])
+        for name in names:
+            table[name] = columns[name]
+
+        return cls(table, vectors, speed_vector)
+
+
+    @classmethod
+    def from_batch(cls, params, result, vectors=()):
+        '''
+        create store from design_batch parameters and results, keeping the per bin outputs in 'vectors'
+        '''
+        p = broadcast_parameters(params)
+        columns = {key: p[key] for key in PARAMETER_KEYS}
+        columns.update({key: result[key] for key in RESULT_KEYS if key in result})
+
+        return cls.from_columns(columns, {key: result[key] for key in vectors}, result.get('speed_vector'))
+
+
+    @property
+    def columns(self):
+        '''
+        names of the scalar columns
+        '''
+        return self.table.dtype.names
+
+
+    def __len__(self):
+        return len(self.table)
+
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield DesignView(self, index)
+
+
+    def __getitem__(self, key):
+        '''
+        column by name, DesignView by integer, or a new store for a slice, mask or index array
+        '''
+        if isinstance(key, str):
+            return self.vectors[key] if key in self.vectors else self.table[key]
+        if isinstance(key, (int, np.integer)):
+            index = int(key) + len(self) if key < 0 else int(key)
+            if not 0 <= index < len(self):
+                raise IndexError(f'design {key} out of range for {len(self)} designs')
+            return DesignView(self, index)
+
+        return ResultStore(self.table[key], {name: vector[key] for name, vector in self.vectors.items()}, self.speed_vector)
+
+
+    def filter(self, mask):
+        '''
+        designs where the boolean 'mask' is set
+        '''
+        return self[np.asarray(mask, dtype=bool)]
+
+
+    def sort(self, by, descending=False):
+        '''
+        designs sorted by one column
+        '''
+        order = np.argsort(self.table[by], kind='stable')
+        return self[order[::-1] if descending else order]
+
+
+    def top(self, by, n):
+        '''
+        'n' designs with the largest values of a column, without sorting the whole store (empty when n <= 0)
+        '''
+        n = min(n, len(self))
+        if n <= 0:
+            return self[np.arange(0)]
+        index = np.argpartition(self.table[by], len(self) - n)[len(self) - n:]
+        return self[index[np.argsort(self.table[by][index])[::-1]]]
+
+
+    def save(self, path):
+        '''
+        save store to a directory of .npy files that can be memory-mapped
+        '''
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'table.npy'), self.table)
+        for name, vector in self.vectors.items():
+            np.save(os.path.join(path, f'{name}.npy'), vector)
+        if self.speed_vector is not None:
+            np.save(os.path.join(path, 'speed_vector.npy'), self.speed_vector)
+
+        with open(os.path.join(path, 'store.json'), 'w') as file:
+            json.dump({'vectors': list(self.vectors), 'speed_vector': self.speed_vector is not None}, file)
+
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        '''
+        load a saved store, memory-mapped by default so only the rows used are read
+        '''
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, 'store.json'), 'r') as file:
+            meta = json.load(file)
+
+        table = np.load(os.path.join(path, 'table.npy'), mmap_mode=mode)
+        vectors = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in meta['vectors']}
+        speed_vector = np.load(os.path.join(path, 'speed_vector.npy')) if meta['speed_vector'] else None
+
+        return cls(table, vectors, speed_vector)
+
+
+    @classmethod
+    def concatenate(cls, stores):
+        '''
+        join stores with the same columns
+        '''
+        stores = list(stores)
+        table = np.concatenate([store.table for store in stores])
+        vectors = {name: np.concatenate([store.vectors[name] for store in stores]) for name in stores[0].vectors}
+
+        return cls(table, vectors, stores[0].speed_vector)
@@ -0,0 +1,185 @@
+from batch import *
+from main import load_params
+from tower import Tower
+
+import argparse
+from scipy.special import digamma
+
+OUTPUTS = ('energy_production', 'rated_power', 'thickness_gravity', 'thickness_aerodynamic', 'thickness_extreme_wind')
+K_STEP = 1e-5 # relative step of the weibull k derivatives of the speed and energy shape factors
+
+
+def speed_factor(limit, k):
+    '''
+    design speed over weibull 'c' where the weibull energy CDF crosses 'limit', a function of k only
+    '''
+    return gammaincinv(1 + 3/k, limit) ** (1/k)
+
+
+def energy_factor(k, cutin_limit=CUTIN_LIMIT, rated_limit=RATED_LIMIT, cutout_limit=CUTOUT_LIMIT):
+    '''
+    analytic energy production over hours * availability * 0.5 * rho * area * cp * efficiency * c³
+    with the analytic design speeds, a function of k only
+    '''
+    s = 1 + 3/k
+    rated = speed_factor(rated_limit, k)
+    cutout = speed_factor(cutout_limit, k)
+    cutin = np.minimum(cutin_limit ** (1/3) * rated, rated)
+
+    # cubic region between cut-in and rated speed and flat region between rated and cut-out speed
+    cubic_energy = gamma(s) * (gammainc(s, rated ** k) - gammainc(s, cutin ** k))
+    rated_energy = rated ** 3 * (np.exp(-rated ** k) - np.exp(-cutout ** k))
+
+    return cubic_energy + rated_energy
+
+
+def log_derivative(function, k, step=K_STEP):
+    '''
+    derivative of the logarithm of a function of k, by central difference
+    '''
+    h = step * k
+    return (np.log(function(k + h)) - np.log(function(k - h))) / (2 * h)
+
+
+def gradients(params, rho=RHO, hours=YEAR_HOURS, cutin_limit=CUTIN_LIMIT, rated_limit=RATED_LIMIT,
+              cutout_limit=CUTOUT_LIMIT, relative=False):
+    '''
+    derivatives of the analytic energy production, rated power and tower thicknesses with respect to every
+    project.json parameter, for many designs in one pass \n
+    the energy production is the exact weibull integral with the analytic design speeds
+    (design_batch with speed_method='analytic', energy_production_analytic), which is smooth in every input \n
+    input: dict of project.json parameters, each a scalar or an array (same units as project.json) \n
+    returns values {output: (designs,)} and gradients {output: {parameter: (designs,)}} per project.json unit,
+    or elasticities (relative change of the output per relative change of the parameter) if 'relative' is set
+    '''
+    p = broadcast_parameters(params)
+    speeds = design_speeds(p, rho, cutin_limit, rated_limit, cutout_limit)
+
+    k = p['k_factor']
+    z0 = p['z0'] # mm, the log law only depends on height / z0 ratios
+    down_time = p['down_time'] / 100
+    hub_height = p['hub_height']
+    area = speeds['area']
+    c_weibull = speeds['c_weibull']
+
+    # values
+    factor = 0.5 * rho * area * p['cp'] * p['dt_efficiency']
+    energy_production = hours * (1 - down_time) * factor * c_weibull ** 3 * energy_factor(k, cutin_limit, rated_limit, cutout_limit)
+
+    tower = Tower(hub_height)
+    tower.gravity_load(speeds['rated_power'])
+    tower.aerodynamic_load(rho, area, speeds['speed_rated'])
+    tower.extreme_wind_load(rho, area)
+
+    values = {
+        'energy_production': energy_production,
+        'rated_power': speeds['rated_power'],
+        'thickness_gravity': tower.thickness_gravity,
+        'thickness_aerodynamic': tower.thickness_aerodynamic,
+        'thickness_extreme_wind': tower.thickness_extreme_wind,
+    }
+
+    # logarithmic derivatives of the weibull 'c' parameter: log law and gamma function
+    log_hub = np.log(hub_height * 1000 / z0)
+    log_measured = np.log(p['avg_u_height'] * 1000 / z0)
+    zero = np.zeros_like(k)
+    log_c = {key: zero for key in PARAMETER_KEYS}
+    log_c.update({
+        'avg_u_speed': 1 / p['avg_u_speed'],
+        'avg_u_height': -1 / (p['avg_u_height'] * log_measured),
+        'hub_height': 1 / (hub_height * log_hub),
+        'z0': (1 / log_measured - 1 / log_hub) / z0,
+        'k_factor': digamma(1 + 1/k) / k ** 2,
+    })
+
+    # rated speed is c times a function of k
+    log_rated_speed = dict(log_c)
+    log_rated_speed['k_factor'] = log_c['k_factor'] + log_derivative(lambda x: speed_factor(rated_limit, x), k)
+
+    # rated power ~ area * cp * efficiency * rated_speed³
+    log_rated_power = {key: 3 * value for key, value in log_rated_speed.items()}
+    log_rated_power['turbine_diameter'] = 2 / p['turbine_diameter']
+    log_rated_power['cp'] = 1 / p['cp']
+    log_rated_power['dt_efficiency'] = 1 / p['dt_efficiency']
+
+    # energy ~ (1 - down_time) * area * cp * efficiency * c³ * energy_factor(k)
+    log_energy = {key: 3 * value for key, value in log_c.items()}
+    log_energy['k_factor'] = 3 * log_c['k_factor'] + log_derivative(
+        lambda x: energy_factor(x, cutin_limit, rated_limit, cutout_limit), k)
+    log_energy['turbine_diameter'] = 2 / p['turbine_diameter']
+    log_energy['cp'] = 1 / p['cp']
+    log_energy['dt_efficiency'] = 1 / p['dt_efficiency']
+    log_energy['down_time'] = -1 / (100 - p['down_time'])
+
+    # gravity thickness ~ rated_power / (hub_height * (sigma - hub_height * steel weight))
+    log_gravity = dict(log_rated_power)
+    log_gravity['hub_height'] = log_rated_power['hub_height'] - 1 / hub_height \
+        + STEEL_DENSITY * GRAVITY / (SIGMA_ALLOWED - hub_height * STEEL_DENSITY * GRAVITY)
+
+    # aerodynamic thickness ~ area * rated_speed² / hub_height, tower diameter grows with hub height
+    log_aerodynamic = {key: 2 * value for key, value in log_rated_speed.items()}
+    log_aerodynamic['turbine_diameter'] = 2 / p['turbine_diameter']
+    log_aerodynamic['hub_height'] = 2 * log_rated_speed['hub_height'] - 1 / hub_height
+
+    # extreme wind thickness ~ area / hub_height
+    log_extreme_wind = {key: zero for key in PARAMETER_KEYS}
+    log_extreme_wind['turbine_diameter'] = 2 / p['turbine_diameter']
+    log_extreme_wind['hub_height'] = -1 / hub_height
+
+    logarithmic = {
+        'energy_production': log_energy,
+        'rated_power': log_rated_power,
+        'thickness_gravity': log_gravity,
+        'thickness_aerodynamic': log_aerodynamic,
+        'thickness_extreme_wind': log_extreme_wind,
+    }
+
+    if relative:
+        result = {name: {key: derivative * p[key] for key, derivative in log.items()} for name, log in logarithmic.items()}
+    else:
+        result = {name: {key: derivative * values[name] for key, derivative in log.items()} for name, log in logarithmic.items()}
+
+    return values, result
+
+
+def finite_differences(params, step=1e-6, **options):
+    '''
+    central finite differences of the same outputs with design_batch, to check gradients \n
+    input: relative parameter step and design_batch keyword options
+    '''
+    p = broadcast_parameters(params)
+    result = {name: {} for name in OUTPUTS}
+
+    for key in PARAMETER_KEYS:
+        h = step * p[key]
+        outputs = []
+        for sign in (1, -1):
+            shifted = dict(p)
+            shifted[key] = p[key] + sign * h
+            outputs.append(design_batch(shifted, vectors=False, speed_method='analytic', **options))
+
+        for name in OUTPUTS:
+            source = 'energy_production_analytic' if name == 'energy_production' else name
+            result[name][key] = (outputs[0][source] - outputs[1][source]) / (2 * h)
+
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='sensitivity of energy production, rated power and tower thicknesses')
+    parser.add_argument('--relative', action='store_true', help='print elasticities (% output per % parameter)')
+    parser.add_argument('--check', action='store_true', help='compare with finite differences')
+    args = parser.parse_args()
+
+    params = load_params()
+    values, result = gradients(params, relative=args.relative)
+    check = finite_differences(params) if args.check else None
+
+    for name in OUTPUTS:
+        print(f'\n{name}: {values[name][0]:.6g}')
+        for key in PARAMETER_KEYS:
+            line = f'  d/d {key:<18}{result[name][key][0]: .6g}'
+            if check is not None:
+                reference = check[name][key][0] * (params[key] / values[name][0] if args.relative else 1)
+                line += f'   finite difference {reference: .6g}'
+            print(line)
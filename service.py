@@ -0,0 +1,466 @@
+from batch import *
+from main import load_params
+
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+HOST = '127.0.0.1'
+PORT = 8080
+BATCH_WINDOW = 0.005 # seconds requests wait to be evaluated together
+MAX_BATCH = 10_000 # designs per batch evaluation
+CACHE_SIZE = 100_000 # designs kept in the result cache
+LATENCY_SAMPLES = 10_000 # latest request latencies kept for the metrics
+MAX_BODY = 1 << 20 # bytes
+
+# report.txt values returned for each design
+REPORT_KEYS = ('hub_speed', 'rated_power', 'speed_cutin', 'speed_rated', 'speed_cutout', 'energy_production',
+               'energy_production_analytic', 'energy_discrepancy', 'full_load_hours', 'average_power',
+               'thickness_gravity', 'thickness_aerodynamic', 'thickness_extreme_wind', 'tower_mass')
+
+# open intervals of physically meaningful parameters, project.json units
+PARAMETER_BOUNDS = {
+    'k_factor': (1 - 1e-12, 20), # the weibull pdf is infinite at 0 m/s below 1
+    'avg_u_speed': (0, np.inf),
+    'avg_u_height': (0, np.inf),
+    'z0': (0, np.inf), # mm, also below both heights
+    'down_time': (-1e-12, 100), # %
+    'turbine_diameter': (0, np.inf),
+    'hub_height': (0, np.inf),
+    'cp': (0, 16/27 + 1e-12), # Betz limit
+    'dt_efficiency': (0, 1 + 1e-12),
+}
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error'}
+
+
+def evaluate_designs(designs, options):
+    '''
+    evaluate a list of parameter tuples (PARAMETER_KEYS order) in one design_batch call, in a worker \n
+    returns one dict of report values per design
+    '''
+    columns = np.array(designs, dtype=np.float64).reshape(-1, len(PARAMETER_KEYS))
+    result = design_batch(dict(zip(PARAMETER_KEYS, columns.T)), vectors=False, **options)
+
+    # energy production of the method used in report.txt
+    if AEP_METHOD != 'binned':
+        result['energy_production'] = result['energy_production_analytic']
+
+    table = np.column_stack([result[key] for key in REPORT_KEYS]).tolist()
+    return [dict(zip(REPORT_KEYS, row)) for row in table]
+
+
+class BadRequest(ValueError):
+    '''
+    malformed HTTP request, answered with 400
+    '''
+
+
+class DesignService():
+    '''
+    class to serve turbine designs over HTTP/JSON: concurrent requests within a short window are
+    evaluated together in one design_batch call on a process pool, and results are cached
+    '''
+
+    def __init__(self, base=None, workers=None, window=BATCH_WINDOW, max_batch=MAX_BATCH, cache_size=CACHE_SIZE,
+                 **options):
+        '''
+        initialize service with the default parameters of partial requests (project.json when not given),
+        pool size (1 evaluates in a thread of this process), batching window in seconds and cache size \n
+        extra keyword options are passed to design_batch
+        '''
+        self.base = load_params() if base is None else base
+        self.window = window
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.options = options
+        self.executor = None if workers == 1 else ProcessPoolExecutor(workers)
+
+        self.cache = OrderedDict()
+        self.pending = [] # (key, future) waiting for the next batch
+        self.running = {} # key -> future of designs pending or being evaluated
+        self.flush_handle = None
+
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.counts = {'requests': 0, 'designs': 0, 'cache_hits': 0, 'coalesced': 0, 'batches': 0, 'errors': 0}
+        self.batch_time = 0.0
+
+
+    def design_key(self, params):
+        '''
+        parameter tuple of a request, missing keys taken from the base parameters \n
+        raises ValueError for unknown keys, non numeric or non physical values
+        '''
+        if not isinstance(params, dict):
+            raise ValueError('each design must be a parameter object')
+        unknown = set(params) - set(PARAMETER_KEYS)
+        if unknown:
+            raise ValueError(f'unknown design parameters: {", ".join(sorted(unknown))}')
+
+        try:
+            key = tuple(float(params.get(key, self.base[key])) for key in PARAMETER_KEYS)
+        except (TypeError, ValueError):
+            raise ValueError('design parameters must be numbers') from None
+
+        values = dict(zip(PARAMETER_KEYS, key))
+        for name, (low, high) in PARAMETER_BOUNDS.items():
+            if not low < values[name] < high:
+                raise ValueError(f'{name} = {values[name]:g} is outside ({max(low, 0):g}, {high:g})')
+        if values['z0'] / 1000 >= min(values['avg_u_height'], values['hub_height']):
+            raise ValueError('z0 must be below the measurement and hub heights')
+
+        return key
+
+
+    async def design(self, params):
+        '''
+        report values of one design, from the cache, a design already being evaluated or the next batch
+        '''
+        key = self.design_key(params)
+        self.counts['designs'] += 1
+
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.counts['cache_hits'] += 1
+            return dict(self.cache[key])
+
+        if key in self.running:
+            self.counts['coalesced'] += 1
+            return dict(await asyncio.shield(self.running[key]))
+
+        future = asyncio.get_running_loop().create_future()
+        self.running[key] = future
+        self.pending.append((key, future))
+
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+        return dict(await asyncio.shield(future))
+
+
+    def flush(self):
+        '''
+        start evaluating the pending designs as one batch
+        '''
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self.evaluate(batch))
+
+
+    async def evaluate(self, batch):
+        '''
+        evaluate a batch off the event loop and resolve the futures of its designs
+        '''
+        keys = [key for key, _ in batch]
+        start = time.perf_counter()
+
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, evaluate_designs, keys, self.options)
+        except Exception as error:
+            for key, future in batch:
+                self.running.pop(key, None)
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.batch_time += time.perf_counter() - start
+        self.counts['batches'] += 1
+
+        for (key, future), result in zip(batch, results):
+            self.running.pop(key, None)
+            self.remember(key, result)
+            if not future.done():
+                future.set_result(result)
+
+
+    def remember(self, key, result):
+        '''
+        add a result to the cache, evicting the least recently used ones
+        '''
+        self.cache[key] = result
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+
+    def metrics(self):
+        '''
+        request counts and latency statistics in milliseconds
+        '''
+        latencies = np.array(self.latencies) * 1000
+        metrics = dict(self.counts)
+        metrics['cached'] = len(self.cache)
+        metrics['mean_batch_size'] = (self.counts['designs'] - self.counts['cache_hits'] - self.counts['coalesced']) \
+            / self.counts['batches'] if self.counts['batches'] else 0
+        metrics['mean_batch_ms'] = self.batch_time * 1000 / self.counts['batches'] if self.counts['batches'] else 0
+        if latencies.size:
+            metrics.update(latency_mean_ms=latencies.mean(), latency_p50_ms=np.percentile(latencies, 50),
+                           latency_p95_ms=np.percentile(latencies, 95), latency_max_ms=latencies.max())
+
+        return metrics
+
+
+    async def route(self, method, path, body):
+        '''
+        answer one request, returns status and json serializable content \n
+        POST /design takes one parameter dict or a list of them, GET /metrics and GET /health
+        '''
+        if path == '/design':
+            if method != 'POST':
+                return 405, {'error': 'use POST'}
+            try:
+                request = json.loads(body or b'{}')
+                if isinstance(request, list):
+                    return 200, list(await asyncio.gather(*(self.design(params) for params in request)))
+                if isinstance(request, dict):
+                    return 200, await self.design(request)
+                raise ValueError('request must be a parameter object or a list of them')
+            except ValueError as error:
+                return 400, {'error': str(error)}
+
+        if path == '/metrics' and method == 'GET':
+            return 200, self.metrics()
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok'}
+
+        return 404, {'error': f'no route {method} {path}'}
+
+
+    async def handle(self, reader, writer):
+        '''
+        serve the requests of one connection (HTTP/1.1 keep-alive) until the client closes it
+        '''
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+
+                start = time.perf_counter()
+                self.counts['requests'] += 1
+                if body is None:
+                    status, content = 413, {'error': f'body larger than {MAX_BODY} bytes'}
+                else:
+                    try:
+                        status, content = await self.route(method, path, body)
+                    except Exception as error:
+                        status, content = 500, {'error': repr(error)}
+
+                latency = time.perf_counter() - start
+                if path == '/design':
+                    self.latencies.append(latency)
+                if status != 200:
+                    self.counts['errors'] += 1
+
+                close = headers.get('connection', '').lower() == 'close'
+                writer.write(http_response(status, content, latency, close))
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as error:
+            # malformed request line, header or too long line
+            self.counts['errors'] += 1
+            writer.write(http_response(400, {'error': str(error) or 'bad request'}, 0, close=True))
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+    async def serve(self, host=HOST, port=PORT):
+        '''
+        start listening, returns the asyncio server
+        '''
+        return await asyncio.start_server(self.handle, host, port)
+
+
+    def close(self):
+        '''
+        stop the process pool
+        '''
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+async def read_request(reader):
+    '''
+    read one HTTP request: request line, headers and a Content-Length body \n
+    returns method, path, headers (lower case names) and body (None when larger than MAX_BODY),
+    or None when the connection is closed
+    '''
+    line = await reader.readline()
+    if not line.strip():
+        return None
+
+    parts = line.decode('latin-1').split()
+    if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+        raise BadRequest('malformed request line')
+    method, path, _ = parts
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise BadRequest('invalid Content-Length') from None
+    if length < 0:
+        raise BadRequest('invalid Content-Length')
+    if length <= MAX_BODY:
+        return method.upper(), path.split('?')[0], headers, await reader.readexactly(length)
+
+    # oversized bodies are skipped in blocks and answered with 413
+    while length > 0:
+        length -= len(await reader.readexactly(min(length, 1 << 16)))
+
+    return method.upper(), path.split('?')[0], headers, None
+
+
+def http_response(status, content, latency, close=False):
+    '''
+    encode a json HTTP response, with the server side latency in a header; content that is not
+    strict json (nan or infinite values) is answered with 500
+    '''
+    try:
+        body = json.dumps(content, allow_nan=False).encode()
+    except ValueError:
+        status, body = 500, json.dumps({'error': 'result is not a finite number'}).encode()
+    head = (f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+            'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'X-Latency-Ms: {latency * 1000:.3f}\r\n'
+            f'Connection: {"close" if close else "keep-alive"}\r\n\r\n')
+
+    return head.encode('latin-1') + body
+
+
+async def request(method, path, content=None, host=HOST, port=PORT):
+    '''
+    send one request to a running service, returns status and decoded json content
+    '''
+    reader, writer = await asyncio.open_connection(host, port)
+    body = b'' if content is None else json.dumps(content).encode()
+    writer.write((f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                  f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    content = json.loads(await reader.readexactly(int(headers['content-length'])))
+
+    writer.close()
+    await writer.wait_closed()
+
+    return status, content
+
+
+def client_design(params, host=HOST, port=PORT):
+    '''
+    design one turbine (dict) or several (list of dicts) with a running service, from synchronous code
+    '''
+    status, content = asyncio.run(request('POST', '/design', params, host, port))
+    if status != 200:
+        raise RuntimeError(f'design service answered {status}: {content.get("error")}')
+
+    return content
+
+
+async def check(requests=200, workers=1):
+    '''
+    start a service on an ephemeral port and check it end to end with the local client: concurrent
+    designs are all answered and evaluated in fewer batches than requests, non physical parameters
+    and a malformed request line are answered with 400 \n
+    raises RuntimeError on the first failed check, returns the service metrics
+    '''
+    service = DesignService(workers=workers)
+    server = await service.serve(HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+
+    try:
+        diameters = np.linspace(60, 120, requests)
+        answers = await asyncio.gather(*[request('POST', '/design', {'turbine_diameter': d}, HOST, port) for d in diameters])
+        if any(status != 200 for status, _ in answers):
+            raise RuntimeError(f'{sum(status != 200 for status, _ in answers)} of {requests} designs failed')
+
+        expected = evaluate_designs([service.design_key({'turbine_diameter': diameters[-1]})], service.options)[0]
+        if answers[-1][1]['rated_power'] != expected['rated_power']:
+            raise RuntimeError('service result differs from design_batch')
+
+        for params in ({'z0': 20000}, {'k_factor': 0.01}, {'cp': 0.7}, {'hub_height': 'high'}):
+            status, _ = await request('POST', '/design', params, HOST, port)
+            if status != 400:
+                raise RuntimeError(f'{params} answered with {status} instead of 400')
+
+        reader, writer = await asyncio.open_connection(HOST, port)
+        writer.write(b'GARBAGE\r\n\r\n')
+        await writer.drain()
+        line = await reader.readline()
+        writer.close()
+        await writer.wait_closed()
+        if line.split()[1:2] != [b'400']:
+            raise RuntimeError(f'malformed request line answered with {line!r}')
+
+        _, metrics = await request('GET', '/metrics', None, HOST, port)
+        if not 0 < metrics['batches'] < requests:
+            raise RuntimeError(f'{requests} concurrent requests evaluated in {metrics["batches"]} batches')
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+
+    return metrics
+
+
+async def run(args):
+    service = DesignService(workers=args.workers, window=args.window / 1000, cache_size=args.cache_size)
+    server = await service.serve(args.host, args.port)
+    print(f'design service on http://{args.host}:{args.port} (POST /design, GET /metrics)')
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HTTP/JSON turbine design service with request batching')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=None, help='process pool size, 1 runs in a thread')
+    parser.add_argument('--window', type=float, default=BATCH_WINDOW * 1000, help='batching window in ms')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+    parser.add_argument('--check', action='store_true', help='check batching and validation on an ephemeral port and exit')
+    args = parser.parse_args()
+
+    if args.check:
+        metrics = asyncio.run(check(workers=args.workers or 1))
+        print(f'service check passed: {metrics["requests"]} requests in {metrics["batches"]} batches')
+        raise SystemExit
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
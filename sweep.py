@@ -0,0 +1,143 @@
+from batch import *
+
+from main import load_params
+from results import ResultStore
+
+import os
+import argparse
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+
+# scalar outputs of design_batch written for every design
+RESULT_KEYS = ('hub_speed', 'c_weibull', 'speed_rated', 'speed_cutout', 'speed_cutin', 'rated_power',
+               'energy_production', 'energy_production_analytic', 'full_load_hours', 'average_power',
+               'thickness_gravity', 'thickness_aerodynamic', 'thickness_extreme_wind')
+COLUMNS = PARAMETER_KEYS + RESULT_KEYS + ('tower_mass', 'energy_per_tonne')
+
+
+def pareto_front(energy, mass):
+    '''
+    indexes of the designs not dominated by any other (more energy with less or equal steel mass),
+    sorted by increasing mass
+    '''
+    # sort by mass and, for equal mass, by decreasing energy
+    order = np.lexsort((-energy, mass))
+
+    # a design is on the front if it produces more than every lighter design
+    best_before = np.maximum.accumulate(np.concatenate(([-np.inf], energy[order][:-1])))
+
+    return order[energy[order] > best_before]
+
+
+def grid_block(base, axes, start, stop):
+    '''
+    project.json parameters of the designs 'start' to 'stop' of the cartesian grid of 'axes' \n
+    input: base parameters, dict of parameter ranges and the slice of the flattened grid
+    '''
+    params = dict(base)
+    if not axes:
+        return params
+
+    shape = tuple(len(values) for values in axes.values())
+    indexes = np.unravel_index(np.arange(start, stop), shape)
+
+    for (key, values), index in zip(axes.items(), indexes):
+        params[key] = np.asarray(values, dtype=np.float64)[index]
+
+    return params
+
+
+def evaluate_block(task):
+    '''
+    evaluate one block of the grid in a worker and return its result columns
+    '''
+    base, axes, start, stop, options = task
+
+    p = broadcast_parameters(grid_block(base, axes, start, stop))
+    result = design_batch(p, vectors=False, **options)
+
+    tower_mass = result['tower_mass']
+
+    columns = {key: p[key] for key in PARAMETER_KEYS}
+    columns.update({key: result[key] for key in RESULT_KEYS})
+    columns['tower_mass'] = tower_mass
+    columns['energy_per_tonne'] = result['energy_production'] / (tower_mass / 1000)
+
+    return columns
+
+
+def ordered_map(executor, function, tasks, window):
+    '''
+    like executor.map, but with at most 'window' tasks submitted and not yet consumed, so finished
+    results waiting to be read in order do not accumulate
+    '''
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(function, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def sweep(ranges, base=None, workers=None, chunk_size=4096, output=None, **options):
+    '''
+    evaluate the cartesian grid of parameter 'ranges' (dict of project.json key -> values) in blocks
+    on a process pool, stream every design to the 'output' csv file and return the pareto optimal
+    designs of energy production against tower steel mass as a ResultStore \n
+    results do not depend on the number of workers, blocks are written in grid order; empty 'ranges'
+    evaluate the base design alone \n
+    extra keyword options are passed to design_batch
+    '''
+    if base is None:
+        base = load_params()
+
+    axes = {key: np.atleast_1d(values) for key, values in ranges.items()}
+    n_designs = int(np.prod([len(values) for values in axes.values()]))
+    tasks = ((base, axes, start, min(start + chunk_size, n_designs), options)
+             for start in range(0, n_designs, chunk_size))
+
+    with ExitStack() as stack:
+        file = stack.enter_context(open(output, 'w')) if output is not None else None
+
+        if workers == 1:
+            blocks = map(evaluate_block, tasks)
+        else:
+            executor = stack.enter_context(ProcessPoolExecutor(workers))
+            blocks = ordered_map(executor, evaluate_block, tasks, 2 * (workers or os.cpu_count() or 1))
+
+        front = None
+        for i, block in enumerate(blocks):
+            if file is not None:
+                np.savetxt(file, np.column_stack([block[key] for key in COLUMNS]), delimiter=',',
+                           header=','.join(COLUMNS) if i == 0 else '', comments='')
+
+            # keep only the running front so memory does not grow with the grid
+            if front is not None:
+                block = {key: np.concatenate((front[key], block[key])) for key in COLUMNS}
+            index = pareto_front(block['energy_production'], block['tower_mass'])
+            front = {key: block[key][index] for key in COLUMNS}
+
+    return ResultStore.from_columns(front)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='parameter sweep over project.json designs')
+    parser.add_argument('--range', nargs=4, action='append', default=[], metavar=('KEY', 'START', 'STOP', 'NUM'),
+                        help='linearly spaced values for a project.json key')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    parser.add_argument('--output', default='sweep.csv')
+    parser.add_argument('--tower-sections', type=int, default=0, help='steel mass of a tapered tower with this many sections')
+    args = parser.parse_args()
+
+    ranges = {key: np.linspace(float(start), float(stop), int(num)) for key, start, stop, num in args.range}
+    front = sweep(ranges, workers=args.workers, chunk_size=args.chunk_size, output=args.output,
+                  tower_sections=args.tower_sections)
+
+    print(f'{len(front)} pareto optimal designs')
+    for design in front:
+        print(f'D = {design.turbine_diameter:.1f} m, H = {design.hub_height:.1f} m, cp = {design.cp:.3f}: '
+              f'{design.energy_production/1000000:.2f} MWh, {design.tower_mass/1000:.1f} t')
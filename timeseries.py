@@ -0,0 +1,179 @@
+from turbine import *
+from constants import *
+
+import os
+from itertools import islice
+
+CHUNK_SIZE = 100_000 # rows read at a time
+
+
+def is_number(text):
+    '''
+    check if a csv field holds a number
+    '''
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def read_chunks(path, columns=(0,), chunk_size=CHUNK_SIZE, delimiter=','):
+    '''
+    read measured data from a csv, parquet or numpy file in blocks of 'chunk_size' rows \n
+    input: file path and columns to read, by index or by header name \n
+    yields 2-D float arrays (rows, columns), so memory is bounded by the chunk size; empty csv fields are nan
+    '''
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.npy':
+        # memory-mapped, only the rows of the current chunk are loaded
+        data = np.load(path, mmap_mode='r')
+        if data.ndim == 1:
+            data = data[:, None]
+        for start in range(0, data.shape[0], chunk_size):
+            yield np.array(data[start:start + chunk_size][:, list(columns)], dtype=np.float64)
+
+    elif extension == '.parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('reading parquet files requires pyarrow') from None
+
+        parquet = pq.ParquetFile(path)
+        names = [parquet.schema_arrow.names[c] if isinstance(c, int) else c for c in columns]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=names):
+            yield np.column_stack([batch.column(name).to_numpy(zero_copy_only=False) for name in names]).astype(np.float64)
+
+    else:
+        with open(path, 'r') as file:
+            # a non numeric first line is a header with the column names, empty fields are gaps
+            first = file.readline()
+            fields = [field.strip() for field in first.split(delimiter)]
+            lines = [first] if all(is_number(field) or not field for field in fields) else []
+            usecols = [fields.index(c) if isinstance(c, str) else c for c in columns]
+
+            while True:
+                lines.extend(islice(file, chunk_size - len(lines)))
+                if not lines:
+                    break
+                try:
+                    chunk = np.loadtxt(lines, delimiter=delimiter, usecols=usecols, ndmin=2)
+                except ValueError:
+                    # chunks with empty fields (gaps in the measurements) are parsed again with nan for them
+                    chunk = np.genfromtxt(lines, delimiter=delimiter, usecols=usecols, filling_values=np.nan, ndmin=2)
+                yield chunk
+                lines = []
+
+
+class SpeedHistogram():
+    '''
+    class to accumulate measured wind speeds into the bins of a speed vector
+    '''
+
+    def __init__(self, speed_vector, step):
+        '''
+        initialize empty histogram over 'speed_vector' bins of width 'step'
+        '''
+        self.speed_vector = speed_vector
+        self.step = step
+
+        self.counts_vector = np.zeros(len(speed_vector), dtype=np.int64)
+        self.samples = 0
+        self.out_of_range = 0
+
+        # running sums for the average speed and the weibull fit
+        self.speed_sum = 0.0
+        self.speed_square_sum = 0.0
+
+
+    def add(self, speeds):
+        '''
+        add a block of wind speeds, missing values (nan) are ignored
+        '''
+        speeds = speeds[np.isfinite(speeds)]
+
+        # nearest bin of each speed
+        index = np.floor(speeds / self.step + 0.5).astype(np.int64)
+        valid = (index >= 0) & (index < len(self.counts_vector))
+
+        self.counts_vector += np.bincount(index[valid], minlength=len(self.counts_vector))
+        self.samples += speeds.size
+        self.out_of_range += speeds.size - np.count_nonzero(valid)
+        self.speed_sum += speeds.sum()
+        self.speed_square_sum += np.square(speeds).sum()
+
+
+    def average(self):
+        '''
+        average of all speeds added
+        '''
+        return self.speed_sum / self.samples
+
+
+    def fit_weibull(self):
+        '''
+        estimate weibull k and c parameters from the running mean and standard deviation
+        (empirical method of Justus) \n
+        returns k, c
+        '''
+        mean = self.average()
+        deviation = np.sqrt(max(self.speed_square_sum / self.samples - mean ** 2, 0))
+
+        k = (deviation / mean) ** -1.086
+        c = mean / gamma(1 + 1/k)
+
+        return k, c
+
+
+def measured_wind(path, column, measured_height, hub_height, z0, rho=RHO, step=WIND_STEP, hours=YEAR_HOURS,
+                  fit=True, chunk_size=CHUNK_SIZE):
+    '''
+    create a Wind object from measured wind speeds streamed from disk, shearing each sample
+    to hub height and binning it into the speed vector \n
+    input: file path and speed column, measurement and hub heights, surface roughness in meters \n
+    the hour distribution is scaled to 'hours'; with 'fit' the weibull k and c of the hub height speeds are stored
+    '''
+    wind = Wind(None, measured_height, rho, step)
+    histogram = SpeedHistogram(wind.speed_vector, step)
+
+    for chunk in read_chunks(path, (column,), chunk_size):
+        histogram.add(log_law(chunk[:, 0], measured_height, hub_height, z0))
+
+    return histogram_wind(wind, histogram, hub_height, z0, hours, fit)
+
+
+def histogram_wind(wind, histogram, hub_height, z0, hours=YEAR_HOURS, fit=True):
+    '''
+    set the measured averages, weibull fit and hour distribution of a Wind object from the
+    SpeedHistogram of its hub height speeds \n
+    input: Wind created with the measurement height and bin width of the histogram
+    '''
+    # measured averages at hub and measurement height
+    wind.hub_speed = histogram.average()
+    wind.average = log_law(wind.hub_speed, hub_height, wind.height, z0)
+    wind.histogram = histogram
+
+    if fit:
+        wind.k, wind.c_weibull = histogram.fit_weibull()
+
+    # measured probability density of each bin and its annual distribution of hours
+    wind.speed_probability_vector = histogram.counts_vector / (histogram.samples * wind.step)
+    wind.hourly_distribution(hours)
+
+    return wind
+
+
+def measured_energy(path, column, measured_height, hub_height, z0, power_curve, sample_hours, down_time=0,
+                    chunk_size=CHUNK_SIZE):
+    '''
+    energy production in Wh of measured wind speeds streamed from disk, evaluating a PowerCurve
+    on every sample sheared to hub height instead of on the binned distribution \n
+    input: file path and speed column, measurement and hub heights, surface roughness in meters,
+    PowerCurve, hours of each sample (1/6 for 10 minute data) and turbine downtime fraction
+    '''
+    energy = 0.0
+    for chunk in read_chunks(path, (column,), chunk_size):
+        energy += power_curve.energy(log_law(chunk[:, 0], measured_height, hub_height, z0), sample_hours, down_time)
+
+    return energy
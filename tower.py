@@ -0,0 +1,96 @@
+from helpers import *
+from constants import *
+
+TOP_DIAMETER_RATIO = 0.5 # top / base diameter of the tapered tower
+SECTIONS = 20 # height sections of the tapered tower
+ITERATIONS = 6 # self-weight iterations of the tapered tower
+
+
+class Tower():
+    '''
+    class to represent the tower of one design or of arrays of designs
+    '''
+
+    def __init__(self, height, diameter=None, sigma_allowed=SIGMA_ALLOWED, steel_density=STEEL_DENSITY):
+        '''
+        initialize tower with its height and base diameter (height / TOWER_SLENDERNESS when not given)
+        '''
+        self.height = height
+        self.diameter = height/TOWER_SLENDERNESS if diameter is None else diameter
+        self.sigma_allowed = sigma_allowed
+        self.steel_density = steel_density
+
+
+    def gravity_load(self, rated_power):
+        '''
+        compute thickness for the gravity load on base of tower from nacelle and tower weight \n
+        input: turbine rated power in W
+        '''
+        self.nacelle_weight = (NACELLE_WEIGHT_POWER * rated_power/1000)*1
+        self.thickness_gravity = (1/(2*np.pi*self.diameter/2))*(self.nacelle_weight*GRAVITY/(self.sigma_allowed-self.height*self.steel_density*GRAVITY))
+
+
+    def aerodynamic_load(self, rho, area, speed_rated):
+        '''
+        compute thickness for the wind load on turbine at rated power
+        '''
+        self.force_aerodynamic = 0.5 * CT * rho * area * (speed_rated ** 2)
+        bending_moment = self.force_aerodynamic * self.height
+        self.thickness_aerodynamic = bending_moment / (self.sigma_allowed * np.pi * (self.diameter/2)**2)
+        self.thickness_aerodynamic *= 2
+
+
+    def extreme_wind_load(self, rho, area, speed=EXTREME_WIND_SPEED):
+        '''
+        compute thickness for the extreme wind load on tower from turbine and tower
+        for an IEC class II turbine (60 m/s)
+        '''
+        self.force_extreme_wind = 0.5 * CD * rho * SOLIDITY * area * (speed ** 2)
+        bending_moment = self.force_extreme_wind * self.height
+        self.thickness_extreme_wind = bending_moment / (self.sigma_allowed * np.pi * (self.diameter/2)**2)
+        self.thickness_extreme_wind *= 2
+
+
+    def steel_mass(self):
+        '''
+        compute governing thickness and steel mass of the cylindrical tower
+        '''
+        self.thickness = np.maximum(np.maximum(self.thickness_gravity, self.thickness_aerodynamic), self.thickness_extreme_wind)
+        self.mass = np.pi * self.diameter * self.thickness * self.height * self.steel_density
+
+
+    def tapered_sections(self, sections=SECTIONS, top_diameter_ratio=TOP_DIAMETER_RATIO, iterations=ITERATIONS):
+        '''
+        size a conical tower discretized in height sections (designs x sections), with the governing
+        rotor force at the top and the nacelle and tower weight above each section \n
+        gravity_load, aerodynamic_load and extreme_wind_load must be computed first
+        '''
+        height = np.asarray(self.height, dtype=np.float64)[..., None]
+        base = np.asarray(self.diameter, dtype=np.float64)[..., None]
+        force = np.maximum(self.force_aerodynamic, self.force_extreme_wind)[..., None]
+        nacelle_weight = np.asarray(self.nacelle_weight, dtype=np.float64)[..., None]
+
+        # section midpoints from base to top and their diameters
+        fraction = (np.arange(sections) + 0.5) / sections
+        self.section_height = height * fraction
+        self.section_diameter = base * (1 - (1 - top_diameter_ratio) * fraction)
+        radius = self.section_diameter / 2
+        length = height / sections
+
+        # bending moment of the rotor force at each section, same factor 2 as the cylindrical check
+        moment = 2 * force * (height - self.section_height)
+
+        # weight above each section depends on the thickness above, refined a few times for all sections at once
+        thickness = np.zeros_like(self.section_height)
+        for _ in range(iterations):
+            section_weight = 2 * np.pi * radius * thickness * length * self.steel_density * GRAVITY
+            weight_above = nacelle_weight * GRAVITY + np.cumsum(section_weight[..., ::-1], axis=-1)[..., ::-1] - section_weight / 2
+            thickness = (weight_above / (2 * np.pi * radius) + moment / (np.pi * radius ** 2)) / self.sigma_allowed
+
+        # stress of the final sections, including their own weight
+        section_weight = 2 * np.pi * radius * thickness * length * self.steel_density * GRAVITY
+        weight_above = nacelle_weight * GRAVITY + np.cumsum(section_weight[..., ::-1], axis=-1)[..., ::-1] - section_weight / 2
+
+        self.section_thickness = thickness
+        self.section_stress = weight_above / (2 * np.pi * radius * thickness) + moment / (np.pi * radius ** 2 * thickness)
+        self.tapered_mass = (2 * np.pi * radius * thickness * length).sum(axis=-1) * self.steel_density
@@ -1,6 +1,5 @@
 from helpers import *
-
-from scipy.special import gamma
+from constants import *
 
 class Wind():
     '''
@@ -25,7 +24,7 @@ class Wind():
         '''
         calculate average wind speed given a height and surface roughness
         '''
-        self.hub_speed = self.average * (np.log(h / z0) / np.log(self.height / z0))
+        self.hub_speed = log_law(self.average, self.height, h, z0)
     
 
     def weibull(self, k):
@@ -37,10 +36,37 @@ class Wind():
         self.k = k
 
         # compute weibull 'c' parameter with gamma function
-        self.c_weibull = self.hub_speed / gamma(1 + 1/k)
+        self.c_weibull = weibull_c(self.hub_speed, k)
 
         # create speed probability distribution function
         self.speed_probability_vector = weibull_pdf(self.speed_vector, k, self.c_weibull)
+        self.speed_probability_matrix = None
+
+
+    def wind_rose(self, directions, frequencies, k, c=None):
+        '''
+        create speed probability distribution of each direction sector (sectors x speed bins) \n
+        input: direction the wind comes from (degrees), frequency and weibull k of each sector,
+        weibull c of each sector (derived from the hub speed when not given)
+        '''
+        self.sector_directions = np.atleast_1d(np.asarray(directions, dtype=np.float64))
+        frequencies = np.broadcast_to(np.asarray(frequencies, dtype=np.float64), self.sector_directions.shape)
+        if np.any(frequencies < 0) or not np.sum(frequencies) > 0:
+            raise ValueError('sector frequencies must be non-negative and not all zero')
+        self.sector_frequencies = frequencies / np.sum(frequencies)
+        self.sector_k = np.broadcast_to(np.asarray(k, dtype=np.float64), self.sector_directions.shape)
+
+        if c is None:
+            self.sector_c = weibull_c(self.hub_speed, self.sector_k)
+        else:
+            self.sector_c = np.broadcast_to(np.asarray(c, dtype=np.float64), self.sector_directions.shape)
+
+        # all sectors in one array operation, weighted by their frequency
+        self.speed_probability_matrix = self.sector_frequencies[:, None] * weibull_pdf(
+            self.speed_vector[None, :], self.sector_k[:, None], self.sector_c[:, None])
+
+        # omnidirectional distribution for the rest of the pipeline
+        self.speed_probability_vector = self.speed_probability_matrix.sum(axis=0)
 
     
     def hourly_distribution(self, hours):
@@ -48,16 +74,22 @@ class Wind():
         create vector with duration of each wind speed for the weibull pdf \n
         input: number of hours in the period of interest
         '''
-        self.hour_distribution_vector = self.speed_probability_vector * hours
+        # probability of each bin is the pdf times the bin width
+        self.hour_distribution_vector = self.speed_probability_vector * (hours * self.step)
+
+        # hours of each direction sector when a wind rose is used
+        if getattr(self, 'speed_probability_matrix', None) is not None:
+            self.hour_distribution_matrix = self.speed_probability_matrix * (hours * self.step)
 
     
-    def energy_density_distribution(self):
+    def energy_density_distribution(self, out=None):
         '''
         create vector with energy for each wind speed and cumulative distribution function\n
+        input: optional preallocated float64 array to store the energy vector
         '''
         # wind energy probability distribution function (PDF) Wh/m2, normalized by area
-        self.energy_distribution_vector = [0.5 * self.rho * (u**3) * t
-                                    for (u, t) in zip(self.speed_vector, self.hour_distribution_vector)]
+        self.energy_distribution_vector = np.multiply(0.5 * self.rho * (self.speed_vector ** 3),
+                                                      self.hour_distribution_vector, out=out)
         
         # energy cumulative distribution function (CDF)
         self.energy_cdf_vector = cdf(self.energy_distribution_vector)
@@ -65,27 +97,37 @@ class Wind():
         # self.energy_cdf_vector = 1 - np.exp(-(self.speed_vector/self.c_weibull)**self.k)
 
 
-    def rated_speed(self, rated_limit):
+    def rated_speed(self, rated_limit, method='binned'):
         '''
         compute rated speed based on the energy CDF \n
-        input: rated_limit design parameters
+        input: rated_limit design parameters and method, 'binned' looks up the speed_vector,
+        'analytic' solves the weibull energy CDF for the exact crossing speed
         '''
-        self.speed_rated = self.speed_vector[np.where(self.energy_cdf_vector > rated_limit)[0][1]] # interception bin + 1
+        if method == 'analytic':
+            self.speed_rated = weibull_energy_speed(rated_limit, self.k, self.c_weibull)
+        else:
+            self.speed_rated = binned_energy_speed(self.speed_vector, self.energy_cdf_vector, rated_limit)
 
 
-    def cutout_speed(self, cutout_limit):
+    def cutout_speed(self, cutout_limit, method='binned'):
         '''
         compute rated and cutout speed based on the energy CDF \n
-        input: cutout_limit design parameters
+        input: cutout_limit design parameters and method, 'binned' looks up the speed_vector,
+        'analytic' solves the weibull energy CDF for the exact crossing speed
         '''
-        self.speed_cutout = self.speed_vector[np.where(self.energy_cdf_vector > cutout_limit)[0][1]] # interception bin + 1
+        if method == 'analytic':
+            self.speed_cutout = weibull_energy_speed(cutout_limit, self.k, self.c_weibull)
+        else:
+            self.speed_cutout = binned_energy_speed(self.speed_vector, self.energy_cdf_vector, cutout_limit)
 
 
-    def wind_power_distribution(self, swept_area):
+    def wind_power_distribution(self, swept_area, rho=None):
         '''
-        create vector of WIND power for each velocity given its probability
+        create vector of WIND power for each velocity given its probability \n
+        input: swept area and optional air density of each speed bin (self.rho when not given)
         '''
-        self.power_distribution_vector = 0.5 * self.rho * swept_area * (self.speed_vector ** 3) * self.speed_probability_vector
+        rho = self.rho if rho is None else rho
+        self.power_distribution_vector = 0.5 * rho * swept_area * (self.speed_vector ** 3) * self.speed_probability_vector
 
 
 class Turbine():
@@ -117,7 +159,7 @@ class Turbine():
 
     def calculate_rated_power(self, rated_speed):
         # calculate rated power
-        self.rated_power = 0.5 * self.rho * self.area * (rated_speed ** 3) * self.cp * self.global_efficiency
+        self.rated_power = rotor_power(self.rho, self.area, rated_speed, self.cp, self.global_efficiency)
 
 
     def cutin_speed(self, cutin_limit):
@@ -125,7 +167,7 @@ class Turbine():
         compute cutin speed based on the turbine power distribution \n
         input: cutin_limit design parameters
         '''
-        self.speed_cutin = (2 * cutin_limit * self.rated_power / (self.rho * self.area * self.cp * self.global_efficiency)) ** (1/3)
+        self.speed_cutin = rotor_speed(cutin_limit * self.rated_power, self.rho, self.area, self.cp, self.global_efficiency)
 
 
     def power_curve(self, speed_cutout, speed_rated):
@@ -133,50 +175,84 @@ class Turbine():
         calculate WEC power curve with cut_in, rated_power and cut_out
         input: cut_out and rated_power 
         '''
-        self.power_curve_vector = 0.5 * self.rho * self.area * (self.speed_vector ** 3) * self.cp * self.global_efficiency
-
         # store wind speed cutout at turbine object
         self.speed_cutout = speed_cutout
         self.speed_rated = speed_rated
 
-        # get indexes
-        cut_in_index = np.where(self.speed_vector < self.speed_cutin)
-        # rated_index = np.where(self.speed_vector >= self.speed_rated)
-        rated_index = np.where(self.power_curve_vector >= self.rated_power)
-        cut_out_index = np.where(self.speed_vector >= self.speed_cutout)
+        self.power_curve_vector = cubic_power_curve(self.speed_vector, self.rho, self.area, self.cp, self.global_efficiency,
+                                                    self.rated_power, self.speed_cutin, self.speed_cutout)
+
 
-        # set values for turbine power curve
-        self.power_curve_vector[cut_in_index] = 0
-        self.power_curve_vector[rated_index] = self.rated_power
-        self.power_curve_vector[cut_out_index] = 0
+    def thrust_coefficient(self):
+        '''
+        thrust coefficient at each speed of the power curve: CT while tracking the power coefficient,
+        decreasing with the power above rated speed and zero when the turbine is stopped
+        '''
+        u = self.speed_vector
+        with np.errstate(divide='ignore'):
+            ct = np.where(u <= self.speed_rated, CT, CT * (self.speed_rated / u) ** 3)
+
+        self.ct_vector = np.where(self.power_curve_vector > 0, ct, 0)
 
 
     def hourly_distribution_downtime(self, hourly_distribution):
         '''
-        include turbine downtime at wind speed hourly distribution
+        include turbine downtime at wind speed hourly distribution \n
+        input: hours of each speed bin, or of each sector and speed bin (Wind.hour_distribution_matrix)
         '''
         self.hourly_distribution_vector = hourly_distribution
         self.hourly_distribution_downtime_vector = hourly_distribution * (1 - self.down_time)
 
 
-    def energy(self):
+    def energy(self, out=None):
         '''
-        calculate turbine energy production at each wind speed
+        calculate turbine energy production at each wind speed \n
+        input: optional preallocated float64 array to store the energy vector
         '''
-        self.energy_vector = [p * t for p, t in zip(self.power_curve_vector, self.hourly_distribution_downtime_vector)]
-        self.energy_production = sum(self.energy_vector)
+        self.energy_vector = np.multiply(self.power_curve_vector, self.hourly_distribution_downtime_vector, out=out)
+        self.energy_production = self.energy_vector.sum()
 
+        # energy of each direction sector for a wind rose
+        if self.energy_vector.ndim > 1:
+            self.sector_energy_vector = self.energy_vector.sum(axis=-1)
 
-    def average_power(self):
+
+    def energy_analytic(self, k, c_weibull, hours, frequencies=1):
         '''
-        calculate average power for each wind speed
+        calculate turbine energy production integrating the power curve exactly over the weibull distribution,
+        independent of the speed vector resolution \n
+        input: weibull k and c parameters and number of hours in the period of interest; for a wind rose,
+        arrays of sector k and c with the sector frequencies
         '''
-        self.average_power_vector = [e / t if t != 0 else 0 for (e, t) in zip(self.energy_vector, self.hourly_distribution_vector)]
-        self.average_power_value = self.energy_production / sum(self.hourly_distribution_vector)
+        energy = analytic_energy(self.rho, self.area, self.cp, self.global_efficiency, self.rated_power,
+                                 self.speed_cutin, self.speed_rated, self.speed_cutout, k, c_weibull)
+
+        self.energy_production_analytic = hours * (1 - self.down_time) * np.sum(frequencies * energy)
+
+        # relative difference of the binned method, when it was computed
+        if hasattr(self, 'energy_production'):
+            self.energy_discrepancy = (self.energy_production - self.energy_production_analytic) / self.energy_production_analytic
+
+
+    def average_power(self, out=None):
+        '''
+        calculate average power for each wind speed \n
+        input: optional preallocated float64 array to store the average power vector
+        '''
+        if out is None:
+            out = np.zeros(np.shape(self.energy_vector))
+        else:
+            out[...] = 0
+
+        # speeds without any duration keep zero average power
+        self.average_power_vector = np.divide(self.energy_vector, self.hourly_distribution_vector,
+                                              out=out, where=self.hourly_distribution_vector != 0)
+        self.average_power_value = self.energy_production / self.hourly_distribution_vector.sum()
 
 
-    def full_load_hours(self):
+    def full_load_hours(self, out=None):
         '''
-        calculate full load hours for each wind speed
+        calculate full load hours for each wind speed \n
+        input: optional preallocated float64 array to store the full load hours vector
         '''
-        self.full_load_hours_vector = [e / self.rated_power for e in self.energy_vector]
+        self.full_load_hours_vector = np.divide(self.energy_vector, self.rated_power, out=out)